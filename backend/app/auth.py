@@ -2,9 +2,19 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import logging
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# 轮数与配置不一致的哈希会被视为需要更新，登录时自动重新哈希
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """验证密码"""
@@ -12,6 +22,10 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     result = pwd_context.verify(plain_password, hashed_password)
     return result
 
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """验证密码，哈希参数过时时返回 (True, 新哈希)，否则新哈希为 None"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """获取密码哈希值"""
     return pwd_context.hash(password)
@@ -26,29 +40,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=getattr(settings, 'access_token_expire_minutes', 30))
     
     to_encode.update({"exp": expire})
-    # 添加调试信息来检查 token 生成
-    print(f"生成 token，过期时间: {expire}")
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-    print(f"生成的 token: {encoded_jwt[:50]}...")  # 只打印前50个字符
+    logger.debug("token issued", extra={"sub": to_encode.get("sub"), "exp": expire.isoformat()})
     return encoded_jwt
 
 def verify_token(token: str, credentials_exception):
     """验证令牌"""
+    payload = decode_token(token, credentials_exception)
+    return payload["sub"]
+
+def decode_token(token: str, credentials_exception):
+    """解码并校验令牌，返回其中的声明"""
     try:
-        print(f"验证 token: {token[:50]}...")  # 添加调试信息
-        print(f"使用密钥: {settings.secret_key[:10]}...")  # 显示密钥前10位
-        print(f"使用算法: {settings.algorithm}")
-        
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        print(f"解码成功，用户名: {username}")
-        print(f"Token 过期时间: {payload.get('exp')}")
-        
-        if username is None:
-            print("用户名为空，抛出异常")
-            raise credentials_exception
-        return username
     except JWTError as e:
-        print(f"JWT 解码失败: {e}")  # 添加详细错误信息
-        print(f"Token 内容: {token}")
+        logger.debug("token rejected", extra={"error": str(e)})
         raise credentials_exception
+    
+    if payload.get("sub") is None:
+        logger.debug("token rejected", extra={"error": "missing subject"})
+        raise credentials_exception
+    
+    logger.debug("token verified", extra={"sub": payload["sub"], "exp": payload.get("exp")})
+    return payload
@@ -0,0 +1,272 @@
+"""
+公开活动接口的响应缓存
+缓存序列化后的响应体，写操作在 crud 中精确失效：
+活动列表和每个活动的评论分页通过代数（generation）整体失效，活动详情按活动 id 删除。
+代数计数器与缓存条目分开保存，不会被 LRU 淘汰，否则计数器归零后旧代数的条目会重新生效。
+进程内缓存看不到其他工作进程的写入，默认（auto）只在单进程部署时启用，多进程部署请使用 redis。
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+from .config import settings
+
+class MemoryBackend:
+    """进程内 LRU，按条目数和字节数双重限制；代数计数器单独保存，不参与淘汰"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._generations = {}  # key -> int
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at)
+            self.bytes += len(key) + len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+
+    def generation(self, key: str) -> int:
+        with self._lock:
+            return self._generations.get(key, 0)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._generations[key] = self._generations.get(key, 0) + 1
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self.bytes = 0
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self.bytes -= len(key) + len(value)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "entries": len(self._entries), "bytes": self.bytes,
+                "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+class FakeRedis:
+    """本地替身，实现缓存用到的 redis-py 客户端方法（get/set/delete/incr/flushdb/info），不淘汰键"""
+
+    def __init__(self):
+        self._data = {}  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                del self._data[key]
+                entry = None
+            return entry[0] if entry is not None else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value if isinstance(value, bytes) else str(value).encode(),
+                               time.time() + ex if ex else None)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            value = int(entry[0]) + 1 if entry is not None else 1
+            self._data[key] = (str(value).encode(), entry[1] if entry is not None else None)
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+    def info(self, section=None):
+        with self._lock:
+            return {"used_memory": sum(len(key) + len(value) for key, (value, _) in self._data.items()),
+                    "db0": {"keys": len(self._data)}}
+
+class RedisBackend:
+    """
+    基于 Redis 协议客户端的共享缓存，多个工作进程之间的失效可以互相看到。
+    缓存条目都带过期时间而代数计数器没有，Redis 设置内存上限时应使用 volatile-* 淘汰策略，计数器不会被淘汰。
+    """
+
+    def __init__(self, client, prefix: str = "sports:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def delete(self, *keys: str):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def generation(self, key: str) -> int:
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        self.client.flushdb()
+
+    def stats(self) -> dict:
+        info = self.client.info("memory")
+        return {"backend": "redis", "bytes": info.get("used_memory")}
+
+class ResponseCache:
+    LIST_GENERATION_KEY = "events:list:generation"
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # 接口在线程池中并发读取缓存，计数需要加锁
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        if self.backend is None:
+            return None
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: bytes):
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def get_response(self, key: str) -> Optional[Tuple[str, Optional[datetime], dict, bytes]]:
+        """读取缓存的响应，返回 (ETag, Last-Modified, 其他响应头, 响应体)"""
+        value = self.get(key)
+        if value is None:
+            return None
+        meta, body = value.split(b"\n", 1)
+        meta = json.loads(meta)
+        modified = datetime.fromisoformat(meta["modified"]) if meta["modified"] else None
+        return meta["etag"], modified, meta["headers"], body
+
+    def set_response(self, key: str, etag: str, modified: Optional[datetime], body: bytes,
+                     headers: Optional[dict] = None):
+        meta = {"etag": etag, "modified": modified.isoformat() if modified else None, "headers": headers or {}}
+        self.set(key, json.dumps(meta).encode() + b"\n" + body)
+
+    # 缓存键
+    def _generation(self, key: str) -> int:
+        return self.backend.generation(key) if self.backend else 0
+
+    @staticmethod
+    def _normalize(params: dict) -> str:
+        return urlencode(sorted((k, str(v)) for k, v in params.items() if v is not None))
+
+    def event_list_key(self, params: dict) -> str:
+        return f"events:list:{self._generation(self.LIST_GENERATION_KEY)}:{self._normalize(params)}"
+
+    @staticmethod
+    def event_detail_key(event_id: int) -> str:
+        return f"events:detail:{event_id}"
+
+    def event_comments_key(self, event_id: int, params: Optional[dict] = None) -> str:
+        generation = self._generation(f"comments:event:{event_id}:generation")
+        return f"comments:event:{event_id}:{generation}:{self._normalize(params or {})}"
+
+    # 失效
+    def invalidate_event_list(self):
+        if self.backend is not None:
+            self.backend.incr(self.LIST_GENERATION_KEY)
+
+    def invalidate_event(self, event_id: int):
+        """活动本身或其报名人数变化：详情和所有列表页失效"""
+        if self.backend is not None:
+            self.backend.delete(self.event_detail_key(event_id))
+            self.invalidate_event_list()
+
+    def invalidate_comments(self, event_id: int):
+        if self.backend is not None:
+            self.backend.incr(f"comments:event:{event_id}:generation")
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        stats = {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+def _single_worker() -> bool:
+    """接口是否只由一个进程提供（SERVER_WORKERS=0 时按可用 CPU 核数）"""
+    if settings.server_workers == 0:
+        from .serve import default_workers
+        return default_workers() == 1
+    return settings.server_workers == 1
+
+def _create_backend():
+    backend = settings.response_cache_backend.lower()
+    if backend == "auto":
+        # 多个工作进程各自的进程内缓存互不失效，会在 TTL 内返回其他进程已修改的数据
+        backend = "memory" if _single_worker() else "none"
+    if backend == "memory":
+        return MemoryBackend(settings.response_cache_max_entries, settings.response_cache_max_bytes)
+    if backend == "fake":
+        return RedisBackend(FakeRedis())
+    if backend == "redis":
+        import redis  # 可选依赖，仅在使用 Redis 时需要
+        return RedisBackend(redis.Redis.from_url(settings.response_cache_url))
+    return None
+
+response_cache = ResponseCache(_create_backend(), settings.response_cache_ttl_seconds)
@@ -0,0 +1,65 @@
+"""
+HTTP 条件请求（ETag / Last-Modified / 304）
+校验值由行的 id、更新时间和报名人数计算，不对整个响应体求哈希，
+因此可以在把数据库行转换成响应模型之前判断是否需要返回 304。
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+def _modified_at(row) -> Optional[datetime]:
+    return getattr(row, "updated_at", None) or row.created_at
+
+def make_etag(prefix: str, rows: Iterable, *extra) -> str:
+    """由每一行的 (id, 更新时间, 报名人数) 和额外参数（如总数）计算弱 ETag"""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(prefix.encode())
+    for row in rows:
+        digest.update(f"|{row.id}:{_modified_at(row)}:{getattr(row, 'registered_count', '')}".encode())
+    for value in extra:
+        digest.update(f"|{value}".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+def last_modified(row) -> Optional[datetime]:
+    value = _modified_at(row)
+    if value is not None and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # 数据库中的时间均为 UTC
+    return value
+
+def is_not_modified(request: Request, etag: str, modified: Optional[datetime] = None) -> bool:
+    # 同时提供时以 If-None-Match 为准（RFC 9110 13.2.2）
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP 日期只精确到秒
+        return modified.replace(microsecond=0) <= since
+    return False
+
+def _headers(etag: str, modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+    return headers
+
+def not_modified(etag: str, modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=_headers(etag, modified))
+
+def json_response(body: bytes, etag: str, modified: Optional[datetime] = None,
+                  headers: Optional[dict] = None) -> Response:
+    return Response(
+        content=body, media_type="application/json", headers={**_headers(etag, modified), **(headers or {})}
+    )
@@ -5,11 +5,96 @@ import os
 class Settings(BaseSettings):
     # SQLite 数据库配置 - 存储在项目根目录
     database_url: str = "sqlite:///./sports_platform.db"
+    async_db: bool = False  # 接口使用异步引擎（SQLite 需要 aiosqlite，PostgreSQL 需要 asyncpg）
+    async_database_url: Optional[str] = None  # 默认由 database_url 推导
+
+    # SQLite 连接参数（每个新连接上执行的 PRAGMA）
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64000  # 负数表示 KiB
+    sqlite_temp_store: str = "MEMORY"
+
+    # 连接池参数（非 SQLite 数据库）
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+
     secret_key: str = "sports-platform-secret-key-please-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     debug: bool = True
 
+    # 令牌校验缓存（0 表示关闭）
+    token_cache_size: int = 10000
+    token_cache_ttl_seconds: int = 60
+
+    # 使用 orjson 编码响应并由行元组直接构造列表（需要安装 orjson）
+    fast_json: bool = False
+
+    # 公开活动接口的响应缓存（auto / memory / redis / fake / none）
+    response_cache_backend: str = "auto"  # auto：单个工作进程时用 memory，多进程时关闭（请改用 redis）
+    response_cache_url: str = "redis://localhost:6379/0"
+    response_cache_ttl_seconds: int = 30  # 也限定了其他进程写入后本进程缓存的最长过期时间
+    response_cache_max_entries: int = 5000
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+
+    # 请求耗时和查询统计（/metrics 接口）
+    metrics_enabled: bool = True
+    server_timing: bool = True  # 在响应头中返回 Server-Timing
+    n_plus_one_threshold: int = 10  # 同一语句在一个请求中执行达到该次数时记为疑似 N+1（0 表示不检测）
+
+    # 生产服务（python -m app.serve）
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 0  # 0 表示按可用 CPU 核数
+    server_graceful_timeout_seconds: int = 30  # 停止时等待进行中请求完成的时长
+
+    # 令牌桶限流（memory / redis / none）：额度写作 "次数/秒数"，规则间用逗号分隔，路径中的 {参数} 匹配任意一段
+    rate_limit_backend: str = "memory"  # memory 按进程计数，多进程部署时实际额度为进程数倍
+    rate_limit_redis_url: str = "redis://localhost:6379/1"
+    rate_limit_default: str = "300/60"  # 未匹配规则的请求共用的额度
+    rate_limits: str = (
+        "POST /auth/login=10/60,POST /auth/register=5/60,"
+        "GET /events=120/60,POST /events/{event_id}/register=30/60,POST /comments=30/60"
+    )
+    rate_limit_exempt_paths: str = "/health,/metrics"
+    # 只有直连地址在 rate_limit_trusted_proxies 中（即请求确实来自反向代理，如 frontend/nginx.conf）时才使用 X-Real-IP，
+    # 否则任何客户端都能伪造该请求头绕过按 IP 的限流
+    rate_limit_trust_x_real_ip: bool = False
+    rate_limit_trusted_proxies: str = "127.0.0.1,::1"  # 逗号分隔的地址或网段，如 "172.28.0.0/16"
+    rate_limit_shards: int = 16
+    rate_limit_max_entries: int = 100000
+
+    # 写接口的幂等键（Idempotency-Key 请求头，database / memory / none）
+    idempotency_backend: str = "database"  # memory 只在单个进程内有效
+    idempotency_ttl_seconds: int = 24 * 3600  # 响应保存时长
+    idempotency_lock_seconds: int = 60  # 第一次请求超过该时长仍未完成时，允许重试重新执行
+    idempotency_max_entries: int = 100000
+    idempotency_max_body_bytes: int = 64 * 1024  # 超过该大小的响应不保存
+
+    # 密码哈希
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_limit: int = 16  # 排队等待的哈希任务上限，超出返回 503
+
+    # 在线备份（backup_db.py）
+    backup_dir: str = "backups"
+    backup_compress: bool = False
+    backup_keep_last: int = 7  # 保留最近的备份数
+    backup_keep_daily: int = 30  # 另外保留最近多少天中每天最新的一个备份
+    backup_step_pages: int = 256  # 每步复制的页数，步与步之间释放读锁
+    backup_step_sleep_ms: int = 10
+    backup_max_restarts: int = 3  # 分步复制被写入打断的次数上限，超过后一次复制完
+
+    # 日志配置
+    log_level: str = "INFO"
+    log_levels: str = ""  # 按 logger 单独设置级别，如 "app.auth=DEBUG,app.crud=WARNING"
+    auth_log_sample_rate: float = 0.01  # 认证日志（WARNING 以下）的采样比例
+
     class Config:
         env_file = ".env"
 
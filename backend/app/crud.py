@@ -1,8 +1,11 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, or_, func, insert, select, update, tuple_
+from typing import List, Optional, Tuple
+from collections import Counter
 from datetime import datetime
-from . import models, schemas, auth
+from . import models, schemas, auth, fulltext
+from .cache import response_cache
 
 # 用户 CRUD 操作
 def get_user(db: Session, user_id: int):
@@ -14,8 +17,9 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = auth.get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = auth.get_password_hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -28,36 +32,78 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
+def update_user_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.execute(
+        update(models.User).where(models.User.id == user_id).values(hashed_password=hashed_password)
+    )
+    db.commit()
+
 # 活动 CRUD 操作
 def create_event(db: Session, event: schemas.EventCreate, creator_id: int):
     db_event = models.Event(**event.dict(), creator_id=creator_id)
     db.add(db_event)
     db.commit()
-    db.refresh(db_event)
-    return db_event
+    response_cache.invalidate_event_list()
+    return get_event_detail(db, db_event.id)
 
 def get_event(db: Session, event_id: int):
     return db.query(models.Event).filter(models.Event.id == event_id).first()
 
-def get_events(
-    db: Session, 
+# 列表查询的返回形式
+VIEW_ORM = "orm"          # ORM 对象，关联对象随查询预加载
+VIEW_ROWS = "rows"        # 完整字段的行元组，嵌套对象的列以 "字段名__" 为前缀（如 creator__username）
+VIEW_SUMMARY = "summary"  # 精简视图的行元组
+
+def _user_columns(prefix: str):
+    return tuple(
+        getattr(models.User, name).label(f"{prefix}{name}")
+        for name in ("id", "username", "email", "full_name", "phone", "is_active", "created_at")
+    )
+
+def _event_columns(prefix: str = ""):
+    return tuple(
+        getattr(models.Event, name).label(f"{prefix}{name}")
+        for name in (
+            "id", "title", "description", "location", "event_time", "capacity", "price",
+            "status", "creator_id", "registered_count", "created_at", "updated_at"
+        )
+    ) + _user_columns(f"{prefix}creator__")
+
+# 精简视图只查询这些列，结果是行元组而不是 ORM 对象（时间戳列用于计算 ETag）
+EVENT_SUMMARY_COLUMNS = (
+    models.Event.id,
+    models.Event.title,
+    models.Event.location,
+    models.Event.event_time,
+    models.Event.capacity,
+    models.Event.price,
+    models.Event.status,
+    models.Event.registered_count,
+    models.Event.creator_id,
+    models.Event.created_at,
+    models.Event.updated_at,
+)
+
+def _event_listing_query(db: Session, view: str = VIEW_ORM):
+    """活动列表查询：报名人数直接取自活动表，创建者随同一条语句加载"""
+    if view == VIEW_SUMMARY:
+        return db.query(*EVENT_SUMMARY_COLUMNS)
+    if view == VIEW_ROWS:
+        return db.query(*_event_columns()).join(models.User, models.Event.creator_id == models.User.id)
+    return db.query(models.Event).options(joinedload(models.Event.creator))
+
+def _filter_events(
+    query,
     search: Optional[str] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
     location: Optional[str] = None,
-    status: str = "active",
-    skip: int = 0,
-    limit: int = 10
+    status: str = "active"
 ):
-    query = db.query(models.Event).filter(models.Event.status == status)
+    query = query.filter(models.Event.status == status)
     
     if search:
-        query = query.filter(
-            or_(
-                models.Event.title.contains(search),
-                models.Event.description.contains(search)
-            )
-        )
+        query = _search_events(query, search)
     
     if date_from:
         query = query.filter(models.Event.event_time >= date_from)
@@ -68,39 +114,106 @@ def get_events(
     if location:
         query = query.filter(models.Event.location.contains(location))
     
-    return query.offset(skip).limit(limit).all()
+    return query
 
-def get_events_count(
-    db: Session,
+def _search_events(query, search: str, ranked: bool = False):
+    """
+    关键词检索。SQLite 下使用 FTS5 全文索引（ranked 时按 bm25 相关度连接排序），
+    过短的词和不支持全文索引的数据库沿用 LIKE。
+    """
+    if not fulltext.is_enabled(query.session):
+        return query.filter(
+            or_(
+                models.Event.title.contains(search),
+                models.Event.description.contains(search)
+            )
+        )
+    
+    match_query, short_terms = fulltext.parse_search(search)
+    
+    for term in short_terms:
+        query = query.filter(
+            or_(
+                models.Event.title.contains(term),
+                models.Event.description.contains(term),
+                models.Event.location.contains(term)
+            )
+        )
+    
+    if match_query:
+        if ranked:
+            query = query.join(
+                fulltext.events_fts, fulltext.events_fts.c.rowid == models.Event.id
+            ).filter(fulltext.match(match_query)).order_by(fulltext.events_fts.c.rank)
+        else:
+            query = query.filter(models.Event.id.in_(fulltext.matching_ids(match_query)))
+    
+    return query
+
+def get_event_detail(db: Session, event_id: int):
+    """获取活动详情（包含报名人数和创建者）"""
+    return _event_listing_query(db).filter(models.Event.id == event_id).first()
+
+def get_events(
+    db: Session, 
     search: Optional[str] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
     location: Optional[str] = None,
-    status: str = "active"
+    status: str = "active",
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[datetime, int]] = None,
+    view: str = VIEW_ORM
 ):
-    query = db.query(models.Event).filter(models.Event.status == status)
+    """
+    按 (event_time, id) 排序的活动列表，关键词检索时按相关度排序。
+
+    传入 after（上一页最后一条的 (event_time, id)）时使用游标分页，
+    直接从复合索引定位，不再受 OFFSET 深度影响。
+    view 决定返回 ORM 对象还是行元组（见 VIEW_*）。
+    """
+    query = _filter_events(
+        _event_listing_query(db, view),
+        date_from=date_from,
+        date_to=date_to,
+        location=location,
+        status=status
+    )
     
     if search:
-        query = query.filter(
-            or_(
-                models.Event.title.contains(search),
-                models.Event.description.contains(search)
-            )
-        )
+        query = _search_events(query, search, ranked=True)
     
-    if date_from:
-        query = query.filter(models.Event.event_time >= date_from)
+    if after is not None:
+        query = query.filter(tuple_(models.Event.event_time, models.Event.id) > tuple_(*after))
     
-    if date_to:
-        query = query.filter(models.Event.event_time <= date_to)
+    query = query.order_by(models.Event.event_time, models.Event.id)
     
-    if location:
-        query = query.filter(models.Event.location.contains(location))
+    if after is None and skip:
+        query = query.offset(skip)
     
+    return query.limit(limit).all()
+
+def get_events_count(
+    db: Session,
+    search: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    location: Optional[str] = None,
+    status: str = "active"
+):
+    query = _filter_events(
+        db.query(models.Event),
+        search=search,
+        date_from=date_from,
+        date_to=date_to,
+        location=location,
+        status=status
+    )
     return query.count()
 
-def get_user_events(db: Session, user_id: int):
-    return db.query(models.Event).filter(models.Event.creator_id == user_id).all()
+def get_user_events(db: Session, user_id: int, view: str = VIEW_ORM):
+    return _event_listing_query(db, view).filter(models.Event.creator_id == user_id).all()
 
 def update_event(db: Session, event_id: int, event_update: schemas.EventUpdate):
     db_event = db.query(models.Event).filter(models.Event.id == event_id).first()
@@ -108,8 +221,13 @@ def update_event(db: Session, event_id: int, event_update: schemas.EventUpdate):
         update_data = event_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_event, field, value)
+        if "capacity" in update_data:
+            # 扩容后空出的名额依次分给候补队列
+            db.flush()
+            _promote_waitlist(db, event_id)
         db.commit()
-        db.refresh(db_event)
+        response_cache.invalidate_event(event_id)
+        db_event = get_event_detail(db, event_id)
     return db_event
 
 def delete_event(db: Session, event_id: int):
@@ -117,65 +235,460 @@ def delete_event(db: Session, event_id: int):
     if db_event:
         db.delete(db_event)
         db.commit()
+        response_cache.invalidate_event(event_id)
+        response_cache.invalidate_comments(event_id)
     return db_event
 
 # 订单 CRUD 操作
-def create_order(db: Session, user_id: int, event_id: int):
-    # 检查是否已经报名
-    existing_order = db.query(models.Order).filter(
-        and_(models.Order.user_id == user_id, models.Order.event_id == event_id, models.Order.status == "active")
+
+# 报名结果
+REGISTRATION_CREATED = "created"
+REGISTRATION_DUPLICATE = "duplicate"
+REGISTRATION_FULL = "full"
+REGISTRATION_NOT_FOUND = "not_found"
+REGISTRATION_INACTIVE = "inactive"
+REGISTRATION_USER_NOT_FOUND = "user_not_found"
+REGISTRATION_SKIPPED = "skipped"  # all_or_nothing 时因其他人无法报名而未报名
+REGISTRATION_CONFLICT = "conflict"  # 并发修改持续冲突，未能报名
+REGISTRATION_WAITLISTED = "waitlisted"  # 活动已满，已加入候补队列
+
+# 占用报名资格的订单状态：同一用户对同一活动只能有其中之一
+ORDER_STATUS_ACTIVE = "active"
+ORDER_STATUS_WAITLISTED = "waitlisted"
+ORDER_STATUS_CANCELLED = "cancelled"
+
+# 批量操作遇到并发修改时的重试次数
+BATCH_RETRIES = 3
+
+def _get_active_order(db: Session, user_id: int, event_id: int):
+    """用户在该活动上的有效订单或候补订单"""
+    return db.query(models.Order).filter(
+        and_(
+            models.Order.user_id == user_id,
+            models.Order.event_id == event_id,
+            models.Order.status.in_([ORDER_STATUS_ACTIVE, ORDER_STATUS_WAITLISTED])
+        )
     ).first()
+
+def _promote_waitlist(db: Session, event_id: int) -> int:
+    """
+    在当前事务中把候补队首转为有效订单，直到名额用完，返回转正的订单数。
+    队首由 (event_id, id) 上的部分索引直接定位，每转正一人只需一次索引查找和两条 UPDATE。
+    """
+    promoted = 0
+    while True:
+        head = db.scalar(
+            select(models.Order.id)
+            .where(models.Order.event_id == event_id, models.Order.status == ORDER_STATUS_WAITLISTED)
+            .order_by(models.Order.id)
+            .limit(1)
+        )
+        if head is None:
+            return promoted
+        seat = db.execute(
+            update(models.Event)
+            .where(
+                and_(
+                    models.Event.id == event_id,
+                    models.Event.status == "active",
+                    models.Event.registered_count < models.Event.capacity
+                )
+            )
+            .values(registered_count=models.Event.registered_count + 1)
+        )
+        if seat.rowcount == 0:
+            return promoted
+        db.execute(update(models.Order).where(models.Order.id == head).values(status=ORDER_STATUS_ACTIVE))
+        promoted += 1
+
+def _join_waitlist(db: Session, user_id: int, event_id: int):
+    """
+    加入候补队列。入队后在同一事务中尝试转正：入队前恰好有人取消时，
+    空出的名额不会因为取消时队列为空而一直空着。
+    """
+    db_order = models.Order(user_id=user_id, event_id=event_id, status=ORDER_STATUS_WAITLISTED)
+    db.add(db_order)
+    try:
+        db.flush()
+        promoted = _promote_waitlist(db, event_id)
+        db.commit()
+    except IntegrityError:
+        # 用户已有有效订单或已在队列中（包括与之并发的普通报名）
+        db.rollback()
+        return REGISTRATION_DUPLICATE, None
+
+    db.refresh(db_order)
+    if promoted:
+        response_cache.invalidate_event(event_id)
+    outcome = REGISTRATION_CREATED if db_order.status == ORDER_STATUS_ACTIVE else REGISTRATION_WAITLISTED
+    return outcome, get_order(db, db_order.id)
+
+def register_for_event(db: Session, user_id: int, event_id: int, waitlist: bool = False):
+    """
+    报名活动，返回 (报名结果, 订单)。
+
+    占用名额（带容量条件的 UPDATE）和插入订单在同一个事务中完成，
+    重复报名由有效和候补订单共用的部分唯一索引兜底，并发请求既不会超卖也不会重复下单。
+    活动已满且 waitlist 为真时加入候补队列，由取消订单时按先后顺序自动转正。
+    """
+    # 已报名（或已在候补队列中）的请求无需进入写事务
+    if _get_active_order(db, user_id, event_id):
+        return REGISTRATION_DUPLICATE, None
     
-    if existing_order:
-        return None
+    result = db.execute(
+        update(models.Event)
+        .where(
+            and_(
+                models.Event.id == event_id,
+                models.Event.status == "active",
+                models.Event.registered_count < models.Event.capacity
+            )
+        )
+        .values(registered_count=models.Event.registered_count + 1)
+    )
     
-    # 检查活动容量
-    event = db.query(models.Event).filter(models.Event.id == event_id).first()
-    if not event:
-        return None
+    if result.rowcount == 0:
+        db.rollback()
+        event = get_event(db, event_id)
+        if event is None:
+            return REGISTRATION_NOT_FOUND, None
+        if event.status != "active":
+            return REGISTRATION_INACTIVE, None
+        if waitlist:
+            return _join_waitlist(db, user_id, event_id)
+        return REGISTRATION_FULL, None
     
-    registered_count = db.query(models.Order).filter(
-        and_(models.Order.event_id == event_id, models.Order.status == "active")
-    ).count()
+    db_order = models.Order(user_id=user_id, event_id=event_id, status=ORDER_STATUS_ACTIVE)
+    db.add(db_order)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 并发的重复报名或候补：回滚同时撤销名额占用
+        db.rollback()
+        return REGISTRATION_DUPLICATE, None
     
-    if registered_count >= event.capacity:
+    response_cache.invalidate_event(event_id)
+    return REGISTRATION_CREATED, get_order(db, db_order.id)
+
+def get_waitlist_position(db: Session, user_id: int, event_id: int):
+    """用户在活动候补队列中的 (订单, 排位, 队列长度)，不在队列中时返回 None"""
+    db_order = db.query(models.Order).filter(
+        and_(
+            models.Order.user_id == user_id,
+            models.Order.event_id == event_id,
+            models.Order.status == ORDER_STATUS_WAITLISTED
+        )
+    ).first()
+    if db_order is None:
         return None
-    
-    db_order = models.Order(user_id=user_id, event_id=event_id)
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    queue = select(func.count(models.Order.id)).where(
+        models.Order.event_id == event_id, models.Order.status == ORDER_STATUS_WAITLISTED
+    )
+    position = db.scalar(queue.where(models.Order.id <= db_order.id))
+    return db_order, position, db.scalar(queue)
+
+def _batch_outcomes(keys: List[int], outcomes: dict, duplicate: str):
+    """按请求顺序展开结果，请求中重复出现的项记为 duplicate"""
+    seen = set()
+    result = []
+    for key in keys:
+        result.append((key, duplicate if key in seen else outcomes[key]))
+        seen.add(key)
+    return result
+
+def register_batch(db: Session, event_id: int, user_ids: List[int], all_or_nothing: bool = False):
+    """
+    批量报名，返回按请求顺序排列的 [(用户 id, 报名结果, 订单 id)]。
+
+    一次查询找出不存在的用户、一次查询找出已报名的用户，其余用户由一条带容量条件的
+    UPDATE 一并占用名额，再批量插入订单，在同一个事务中提交。名额不足时按请求顺序报名。
+    容量条件不满足或唯一索引冲突（并发报名）时重新读取后重试。
+    """
+    requested = list(dict.fromkeys(user_ids))
+    for _ in range(BATCH_RETRIES):
+        event = db.query(
+            models.Event.status, models.Event.capacity, models.Event.registered_count
+        ).filter(models.Event.id == event_id).first()
+        if event is None or event.status != "active":
+            outcome = REGISTRATION_NOT_FOUND if event is None else REGISTRATION_INACTIVE
+            return [(user_id, outcome, None) for user_id in user_ids]
+
+        known = set(db.scalars(
+            select(models.User.id).where(models.User.id.in_(requested), models.User.is_active.is_(True))
+        ))
+        registered = set(db.scalars(
+            select(models.Order.user_id).where(
+                models.Order.event_id == event_id,
+                models.Order.status.in_([ORDER_STATUS_ACTIVE, ORDER_STATUS_WAITLISTED]),
+                models.Order.user_id.in_(requested),
+            )
+        ))
+        outcomes = {}
+        candidates = []
+        for user_id in requested:
+            if user_id not in known:
+                outcomes[user_id] = REGISTRATION_USER_NOT_FOUND
+            elif user_id in registered:
+                outcomes[user_id] = REGISTRATION_DUPLICATE
+            else:
+                candidates.append(user_id)
+
+        available = max(0, event.capacity - event.registered_count)
+        granted = candidates[:available]
+        for user_id in candidates[available:]:
+            outcomes[user_id] = REGISTRATION_FULL
+        # 与去重后的请求比较：请求中重复出现的用户不应让整批失败
+        if all_or_nothing and len(granted) < len(requested):
+            for user_id in granted:
+                outcomes[user_id] = REGISTRATION_SKIPPED
+            granted = []
+        if not granted:
+            db.rollback()
+            return [(user_id, outcome, None) for user_id, outcome in _batch_outcomes(user_ids, outcomes, REGISTRATION_DUPLICATE)]
+
+        result = db.execute(
+            update(models.Event)
+            .where(
+                and_(
+                    models.Event.id == event_id,
+                    models.Event.status == "active",
+                    models.Event.registered_count + len(granted) <= models.Event.capacity
+                )
+            )
+            .values(registered_count=models.Event.registered_count + len(granted))
+        )
+        if result.rowcount == 0:
+            db.rollback()
+            continue
+        try:
+            db.execute(insert(models.Order), [
+                {"user_id": user_id, "event_id": event_id, "status": ORDER_STATUS_ACTIVE} for user_id in granted
+            ])
+            db.commit()
+        except IntegrityError:
+            # 并发的重复报名：整批回滚（包括名额占用）后重新判断
+            db.rollback()
+            continue
+
+        response_cache.invalidate_event(event_id)
+        order_ids = dict(db.execute(
+            select(models.Order.user_id, models.Order.id).where(
+                models.Order.event_id == event_id,
+                models.Order.status == ORDER_STATUS_ACTIVE,
+                models.Order.user_id.in_(granted),
+            )
+        ).all())
+        for user_id in granted:
+            outcomes[user_id] = REGISTRATION_CREATED
+        return [
+            (user_id, outcome, order_ids.get(user_id) if outcome == REGISTRATION_CREATED else None)
+            for user_id, outcome in _batch_outcomes(user_ids, outcomes, REGISTRATION_DUPLICATE)
+        ]
+
+    return [(user_id, REGISTRATION_CONFLICT, None) for user_id in user_ids]
+
+def create_order(db: Session, user_id: int, event_id: int):
+    outcome, db_order = register_for_event(db, user_id=user_id, event_id=event_id)
     return db_order
 
-def get_user_orders(db: Session, user_id: int):
-    return db.query(models.Order).filter(models.Order.user_id == user_id).all()
+def _order_query(db: Session):
+    """订单查询：活动及其创建者随订单一并加载"""
+    return db.query(models.Order).options(
+        joinedload(models.Order.event).joinedload(models.Event.creator)
+    )
+
+def _order_summary_query(db: Session):
+    return db.query(
+        models.Order.id,
+        models.Order.event_id,
+        models.Order.status,
+        models.Order.created_at,
+        models.Event.title.label("event_title"),
+        models.Event.event_time.label("event_time"),
+        models.Event.location.label("event_location"),
+    ).join(models.Event, models.Order.event_id == models.Event.id)
+
+def _order_rows_query(db: Session):
+    return db.query(
+        models.Order.id,
+        models.Order.user_id,
+        models.Order.event_id,
+        models.Order.status,
+        models.Order.created_at,
+        *_event_columns("event__"),
+    ).join(models.Event, models.Order.event_id == models.Event.id).join(
+        models.User, models.Event.creator_id == models.User.id
+    )
+
+def get_user_orders(db: Session, user_id: int, view: str = VIEW_ORM):
+    if view == VIEW_SUMMARY:
+        query = _order_summary_query(db)
+    elif view == VIEW_ROWS:
+        query = _order_rows_query(db)
+    else:
+        query = _order_query(db)
+    return query.filter(models.Order.user_id == user_id).all()
 
 def get_order(db: Session, order_id: int):
-    return db.query(models.Order).filter(models.Order.id == order_id).first()
+    return _order_query(db).filter(models.Order.id == order_id).first()
 
 def cancel_order(db: Session, order_id: int, user_id: int):
-    db_order = db.query(models.Order).filter(
+    """
+    取消订单。有效订单释放名额，并在同一事务中把候补队首转正；候补订单只是退出队列。
+    只有仍处于有效或候补状态的订单会被取消，重复取消不会重复释放名额。
+    """
+    cancel = (
+        update(models.Order)
+        .where(and_(models.Order.id == order_id, models.Order.user_id == user_id))
+        .values(status=ORDER_STATUS_CANCELLED, cancelled_at=datetime.utcnow())
+        .returning(models.Order.event_id)
+    )
+    event_id = db.scalar(cancel.where(models.Order.status == ORDER_STATUS_ACTIVE))
+    if event_id is not None:
+        db.execute(
+            update(models.Event)
+            .where(models.Event.id == event_id)
+            .values(registered_count=models.Event.registered_count - 1)
+        )
+        _promote_waitlist(db, event_id)
+        db.commit()
+        response_cache.invalidate_event(event_id)
+    elif db.scalar(cancel.where(models.Order.status == ORDER_STATUS_WAITLISTED)) is not None:
+        db.commit()
+    else:
+        db.rollback()
+    
+    return _order_query(db).filter(
         and_(models.Order.id == order_id, models.Order.user_id == user_id)
     ).first()
-    
-    if db_order:
-        db_order.status = "cancelled"
-        db_order.cancelled_at = datetime.utcnow()
+
+# 批量取消结果
+CANCELLATION_CANCELLED = "cancelled"
+CANCELLATION_NOT_FOUND = "not_found"
+CANCELLATION_FORBIDDEN = "forbidden"
+CANCELLATION_ALREADY_CANCELLED = "already_cancelled"
+CANCELLATION_DUPLICATE = "duplicate"
+
+def cancel_orders(db: Session, order_ids: List[int], user_id: int):
+    """
+    批量取消当前用户的订单，返回按请求顺序排列的 [(订单 id, 取消结果)]。
+
+    用 UPDATE ... RETURNING 取消其中仍有效的订单和候补订单，再按活动释放名额并转正候补，
+    在同一个事务中提交。
+    """
+    requested = list(dict.fromkeys(order_ids))
+    owners = dict(db.execute(
+        select(models.Order.id, models.Order.user_id).where(models.Order.id.in_(requested))
+    ).all())
+    own_ids = [order_id for order_id in requested if owners.get(order_id) == user_id]
+
+    cancelled = {}
+    left_waitlist = set()
+    if own_ids:
+        cancel = (
+            update(models.Order)
+            .where(and_(models.Order.id.in_(own_ids), models.Order.user_id == user_id))
+            .values(status=ORDER_STATUS_CANCELLED, cancelled_at=datetime.utcnow())
+        )
+        cancelled = dict(db.execute(
+            cancel.where(models.Order.status == ORDER_STATUS_ACTIVE).returning(models.Order.id, models.Order.event_id)
+        ).all())
+        left_waitlist = set(db.scalars(
+            cancel.where(models.Order.status == ORDER_STATUS_WAITLISTED).returning(models.Order.id)
+        ))
+    if cancelled or left_waitlist:
+        released = Counter(cancelled.values())
+        for event_id, count in released.items():
+            db.execute(
+                update(models.Event)
+                .where(models.Event.id == event_id)
+                .values(registered_count=models.Event.registered_count - count)
+            )
+            _promote_waitlist(db, event_id)
         db.commit()
-        db.refresh(db_order)
-    
-    return db_order
+        for event_id in released:
+            response_cache.invalidate_event(event_id)
+    else:
+        db.rollback()
+
+    outcomes = {}
+    for order_id in requested:
+        if order_id not in owners:
+            outcomes[order_id] = CANCELLATION_NOT_FOUND
+        elif owners[order_id] != user_id:
+            outcomes[order_id] = CANCELLATION_FORBIDDEN
+        elif order_id in cancelled or order_id in left_waitlist:
+            outcomes[order_id] = CANCELLATION_CANCELLED
+        else:
+            outcomes[order_id] = CANCELLATION_ALREADY_CANCELLED
+    return _batch_outcomes(order_ids, outcomes, CANCELLATION_DUPLICATE)
 
 # 评论 CRUD 操作
 def create_comment(db: Session, comment: schemas.CommentCreate, user_id: int):
     db_comment = models.Comment(**comment.dict(), user_id=user_id)
     db.add(db_comment)
     db.commit()
-    db.refresh(db_comment)
-    return db_comment
+    response_cache.invalidate_comments(comment.event_id)
+    return _comment_query(db).filter(models.Comment.id == db_comment.id).first()
+
+def _comment_query(db: Session):
+    """评论查询：评论者按批用一条 IN 查询加载，同一用户的多条评论只加载一次"""
+    return db.query(models.Comment).options(selectinload(models.Comment.user))
+
+def _comment_summary_query(db: Session):
+    return db.query(
+        models.Comment.id,
+        models.Comment.content,
+        models.Comment.user_id,
+        models.Comment.event_id,
+        models.Comment.created_at,
+        models.User.username,
+    ).join(models.User, models.Comment.user_id == models.User.id)
+
+def _comment_rows_query(db: Session):
+    return db.query(
+        models.Comment.id,
+        models.Comment.content,
+        models.Comment.user_id,
+        models.Comment.event_id,
+        models.Comment.created_at,
+        *_user_columns("user__"),
+    ).join(models.User, models.Comment.user_id == models.User.id)
 
-def get_event_comments(db: Session, event_id: int):
-    return db.query(models.Comment).filter(models.Comment.event_id == event_id).all()
+def _event_comments_query(db: Session, event_id: int, view: str = VIEW_ORM):
+    if view == VIEW_SUMMARY:
+        query = _comment_summary_query(db)
+    elif view == VIEW_ROWS:
+        query = _comment_rows_query(db)
+    else:
+        query = _comment_query(db)
+    return query.filter(models.Comment.event_id == event_id).order_by(
+        models.Comment.created_at, models.Comment.id
+    )
+
+def get_event_comments(
+    db: Session,
+    event_id: int,
+    limit: Optional[int] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    view: str = VIEW_ORM
+):
+    """按 (created_at, id) 排序的评论，传入 after（上一页最后一条的 (created_at, id)）时从其后开始"""
+    query = _event_comments_query(db, event_id, view)
+    
+    if after is not None:
+        created_at, comment_id = after
+        query = query.filter(tuple_(models.Comment.created_at, models.Comment.id) > tuple_(created_at, comment_id))
+    
+    if limit is not None:
+        query = query.limit(limit)
+    
+    return query.all()
+
+def iter_event_comments(db: Session, event_id: int, batch_size: int = 500):
+    """逐批读取活动的全部评论（服务端游标），不在内存中保留完整列表"""
+    query = _event_comments_query(db, event_id).execution_options(stream_results=True)
+    yield from query.yield_per(batch_size)
 
 def delete_comment(db: Session, comment_id: int, user_id: int):
     db_comment = db.query(models.Comment).filter(
@@ -183,12 +696,29 @@ def delete_comment(db: Session, comment_id: int, user_id: int):
     ).first()
     
     if db_comment:
+        event_id = db_comment.event_id
         db.delete(db_comment)
         db.commit()
+        response_cache.invalidate_comments(event_id)
     
     return db_comment
 
 def get_event_registered_count(db: Session, event_id: int):
-    return db.query(models.Order).filter(
-        and_(models.Order.event_id == event_id, models.Order.status == "active")
-    ).count()
+    return db.query(models.Event.registered_count).filter(models.Event.id == event_id).scalar()
+
+def _active_order_count():
+    return (
+        select(func.count(models.Order.id))
+        .where(and_(models.Order.event_id == models.Event.id, models.Order.status == "active"))
+        .scalar_subquery()
+    )
+
+def rebuild_registered_counts(db: Session):
+    """根据订单表重建所有活动的报名人数，返回被修正的活动数量"""
+    result = db.execute(
+        update(models.Event)
+        .where(models.Event.registered_count != _active_order_count())
+        .values(registered_count=_active_order_count())
+    )
+    db.commit()
+    return result.rowcount
@@ -1,12 +1,50 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from .config import settings
 
-engine = create_engine(
+def _engine_options(url: str) -> dict:
+    """SQLite 使用默认连接池；其他数据库显式设置连接池大小和连接检测"""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+def _sqlite_pragmas() -> dict:
+    return {
+        "journal_mode": settings.sqlite_journal_mode,
+        "synchronous": settings.sqlite_synchronous,
+        "busy_timeout": settings.sqlite_busy_timeout_ms,
+        "mmap_size": settings.sqlite_mmap_size,
+        "cache_size": settings.sqlite_cache_size,
+        "temp_store": settings.sqlite_temp_store,
+    }
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL 下读写互不阻塞，并发写入在 busy_timeout 内排队而不是直接报 "database is locked"
+    cursor = dbapi_connection.cursor()
+    for name, value in _sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def configure_engine(target_engine):
+    """为 SQLite 引擎注册连接初始化钩子"""
+    if target_engine.dialect.name == "sqlite":
+        event.listen(target_engine, "connect", _apply_sqlite_pragmas)
+    return target_engine
+
+engine = configure_engine(create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+    **_engine_options(settings.database_url)
+))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -18,3 +56,60 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# 异步数据库（ASYNC_DB=True 时启用，接口使用 AsyncSession，脚本仍使用上面的同步引擎）
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def get_async_database_url() -> str:
+    """未单独配置时，由 DATABASE_URL 推导出对应的异步驱动地址"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    url = make_url(settings.database_url)
+    backend = url.get_backend_name()
+    return url.set(drivername=_ASYNC_DRIVERS.get(backend, url.drivername)).render_as_string(hide_password=False)
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.async_db:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(get_async_database_url(), **_engine_options(settings.database_url))
+    configure_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_database_settings() -> dict:
+    """当前生效的数据库设置（SQLite 为实际的 PRAGMA 值，其他数据库为连接池状态）"""
+    if engine.dialect.name != "sqlite":
+        return {
+            "dialect": engine.dialect.name,
+            "async": settings.async_db,
+            "pool": engine.pool.status(),
+        }
+    
+    effective = {}
+    with engine.connect() as conn:
+        for name in _sqlite_pragmas():
+            effective[name] = conn.execute(text(f"PRAGMA {name}")).scalar()
+    return {"dialect": "sqlite", "async": settings.async_db, "pragmas": effective}
+
+# 接口使用的会话依赖
+get_session = get_async_db if settings.async_db else get_db
+
+async def run(db, fn, *args, **kwargs):
+    """
+    在请求中执行同步的 crud 函数而不阻塞事件循环：
+    AsyncSession 通过 run_sync 执行，同步 Session 放到线程池中执行。
+    """
+    if AsyncSessionLocal is not None and isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
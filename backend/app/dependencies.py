@@ -2,25 +2,33 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from . import crud, database, auth
+from .token_cache import Principal, token_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_session)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    username = auth.verify_token(token, credentials_exception)
-    user = crud.get_user_by_username(db, username=username)
+    # 命中缓存时既不解码 JWT 也不查询数据库
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+    
+    payload = auth.decode_token(token, credentials_exception)
+    user = await database.run(db, crud.get_user_by_username, username=payload["sub"])
     
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = Principal(id=user.id, username=user.username, is_active=user.is_active)
+    token_cache.set(token, principal, payload.get("exp"))
+    return principal
 
-def get_current_active_user(current_user = Depends(get_current_user)):
+async def get_current_active_user(current_user = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -0,0 +1,105 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+
+# 活动全文索引（SQLite FTS5 外部内容表，trigram 分词以支持中文子串检索）
+FTS_TABLE = "events_fts"
+MIN_TERM_LENGTH = 3  # trigram 分词下可以走索引的最短检索词
+
+events_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, location,
+        content='events', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON events BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    # 只在可检索字段变化时重建索引行，报名人数等字段的更新不会触发
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description, location ON events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+]
+
+_enabled = {}
+
+def setup_fts(conn) -> bool:
+    """在给定连接上创建全文索引表及同步触发器，新建时从活动表重建索引；当前 SQLite 不支持时返回 False"""
+    key = str(conn.engine.url)
+    if conn.dialect.name != "sqlite":
+        _enabled[key] = False
+        return False
+
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE}
+    ).first()
+    try:
+        for ddl in _FTS_DDL:
+            conn.execute(text(ddl))
+    except OperationalError:
+        # 缺少 FTS5 或 trigram 分词器（SQLite < 3.34）时退回 LIKE 检索
+        _enabled[key] = False
+        return False
+    if not exists:
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    _enabled[key] = True
+    return True
+
+def is_enabled(db) -> bool:
+    """当前会话所用数据库是否可以使用全文索引"""
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+    key = str(engine.url)
+    if key not in _enabled:
+        if engine.dialect.name != "sqlite":
+            _enabled[key] = False
+        else:
+            with engine.connect() as conn:
+                _enabled[key] = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE}
+                ).first() is not None
+    return _enabled[key]
+
+def parse_search(search: str) -> Tuple[Optional[str], List[str]]:
+    """
+    将检索词拆分为 FTS5 MATCH 表达式和过短的检索词。
+
+    每个词作为短语加引号（trigram 下即子串/前缀匹配），多个词之间为 AND；
+    不足三个字符的词（如“篮球”）无法使用 trigram 索引，交给调用方用 LIKE 过滤。
+    """
+    phrases = []
+    short_terms = []
+    for term in search.split():
+        if len(term) >= MIN_TERM_LENGTH:
+            phrases.append('"' + term.replace('"', '""') + '"')
+        else:
+            short_terms.append(term)
+    return (" ".join(phrases) or None), short_terms
+
+def match(match_query: str):
+    """events_fts MATCH 条件"""
+    return literal_column(FTS_TABLE).op("MATCH")(match_query)
+
+def matching_ids(match_query: str):
+    """命中全文索引的活动 id 子查询"""
+    return select(events_fts.c.rowid).where(match(match_query))
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from . import auth
+from .config import settings
+
+class PasswordHasherBusy(Exception):
+    """密码哈希进程池已满，请求应被快速拒绝"""
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.password_hash_workers + settings.password_hash_queue_limit)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=settings.password_hash_workers)
+    return _executor
+
+def _submit(fn, *args):
+    # 正在执行和排队的任务总数受限，超出时立即拒绝，避免登录高峰堆积请求
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+async def hash_password(password: str) -> str:
+    """在独立进程中计算 bcrypt 哈希"""
+    return await asyncio.wrap_future(_submit(auth.get_password_hash, password))
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """在独立进程中校验密码；哈希参数已过时时同时返回新的哈希值"""
+    return await asyncio.wrap_future(_submit(auth.verify_and_update_password, plain_password, hashed_password))
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,276 @@
+"""
+写接口的幂等键
+客户端在活动创建、报名、评论、取消订单等写接口（IDEMPOTENT_ROUTES）上带上 Idempotency-Key 请求头后，
+第一次请求的响应会被保存，之后相同凭据、相同键的重试直接重放保存的响应，不再执行接口，也不会重复写库：
+- 第一次请求仍在处理中（或多次争抢占位都失败）时重试返回 409，键被用于不同的请求（方法、路径或请求体不同）时返回 422
+- 5xx 响应和执行出错的请求不保存，重试会重新执行
+- 默认保存在数据库的 idempotency_keys 表中（多进程共享），按 TTL 过期并限制条目数
+- 认证接口（/auth/*）的请求体含明文密码、响应含访问令牌，不在支持范围内，带键也照常执行且不保存
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+from . import models
+from .config import settings
+
+# 支持幂等键的写接口，路径中的 {参数} 匹配任意一段
+IDEMPOTENT_ROUTES = (
+    ("POST", "/events"),
+    ("POST", "/events/{event_id}/register"),
+    ("POST", "/events/{event_id}/register/batch"),
+    ("POST", "/comments"),
+    ("DELETE", "/orders/batch"),
+    ("DELETE", "/orders/{order_id}"),
+)
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# 每保存这么多次响应清理一次过期和超出上限的条目
+PRUNE_EVERY = 100
+
+class StoredResponse(NamedTuple):
+    fingerprint: str
+    status_code: Optional[int]  # None 表示仍在处理中
+    headers: list
+    body: bytes
+
+class DatabaseStore:
+    """保存在 idempotency_keys 表中，占位行的主键约束保证同一个键只有一个请求在执行"""
+
+    def __init__(self, engine, max_entries: int):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.table = models.IdempotencyKey.__table__
+        self._saved = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, fingerprint: str, lock_seconds: int) -> Optional[StoredResponse]:
+        """插入占位行；键已存在时返回已有的记录，反复争抢失败时按仍在处理中返回"""
+        table = self.table
+        for _ in range(3):
+            now = time.time()
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(delete(table).where(table.c.key == key, table.c.expires_at <= now))
+                    conn.execute(insert(table).values(key=key, fingerprint=fingerprint, expires_at=now + lock_seconds))
+                return None
+            except IntegrityError:
+                with self.engine.connect() as conn:
+                    row = conn.execute(
+                        select(table.c.fingerprint, table.c.status_code, table.c.headers, table.c.body)
+                        .where(table.c.key == key)
+                    ).first()
+                # 查询前第一次请求失败并释放了键，重新占位
+                if row is not None:
+                    return StoredResponse(row.fingerprint, row.status_code, json.loads(row.headers or "[]"), row.body)
+        # 每次都被其他请求抢先占位又释放，不能在没有占位的情况下执行接口，让客户端稍后重试
+        return StoredResponse(fingerprint, None, [], b"")
+
+    def save(self, key: str, status_code: int, headers: list, body: bytes, ttl: int):
+        table = self.table
+        with self.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.key == key, table.c.status_code.is_(None))
+                .values(status_code=status_code, headers=json.dumps(headers), body=body, expires_at=time.time() + ttl)
+            )
+        with self._lock:
+            self._saved += 1
+            prune = self._saved % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def release(self, key: str):
+        table = self.table
+        with self.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.key == key, table.c.status_code.is_(None)))
+
+    def prune(self):
+        """删除过期条目，并只保留最晚过期的 max_entries 条"""
+        table = self.table
+        with self.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.expires_at <= time.time()))
+            conn.execute(delete(table).where(table.c.key.in_(
+                select(table.c.key).order_by(table.c.expires_at.desc()).offset(self.max_entries)
+            )))
+
+    def stats(self) -> dict:
+        return {"backend": "database", "max_entries": self.max_entries}
+
+class MemoryStore:
+    """进程内 LRU，只适合单进程部署和测试"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (StoredResponse, expires_at)
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, fingerprint: str, lock_seconds: int) -> Optional[StoredResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+            self._entries[key] = (StoredResponse(fingerprint, None, [], b""), now + lock_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return None
+
+    def save(self, key: str, status_code: int, headers: list, body: bytes, ttl: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0].status_code is None:
+                self._entries[key] = (entry[0]._replace(status_code=status_code, headers=headers, body=body),
+                                      time.time() + ttl)
+
+    def release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0].status_code is None:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "entries": len(self._entries), "max_entries": self.max_entries}
+
+def _create_store():
+    backend = settings.idempotency_backend.lower()
+    if backend == "database":
+        from .database import engine
+        return DatabaseStore(engine, settings.idempotency_max_entries)
+    if backend == "memory":
+        return MemoryStore(settings.idempotency_max_entries)
+    return None
+
+idempotency_store = _create_store()
+
+def _digest(*parts: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+def _normalize_path(path: str) -> str:
+    return path.rstrip("/") or "/"
+
+def _compile_routes(routes):
+    return [
+        (method, re.compile("^" + re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(_normalize_path(path))) + "$"))
+        for method, path in routes
+    ]
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+class IdempotencyMiddleware:
+    """带 Idempotency-Key 的写请求：第一次执行并保存响应，重试时重放"""
+
+    def __init__(self, app, store=None, routes=IDEMPOTENT_ROUTES):
+        self.app = app
+        self.store = store if store is not None else idempotency_store
+        self.routes = _compile_routes(routes)
+
+    def _applies(self, method: str, path: str) -> bool:
+        path = _normalize_path(path)
+        return any(method == route_method and pattern.match(path) for route_method, pattern in self.routes)
+
+    async def __call__(self, scope, receive, send):
+        if self.store is None or scope["type"] != "http" or not self._applies(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(b"idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        # 键按调用方凭据隔离，不同用户使用相同的键互不影响
+        key = _digest(headers.get(b"authorization", b""), idempotency_key)
+        fingerprint = _digest(
+            scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body)
+
+        stored = await run_in_threadpool(self.store.reserve, key, fingerprint, settings.idempotency_lock_seconds)
+        if stored is not None:
+            await self._respond_stored(stored, fingerprint, scope, receive, send)
+            return
+
+        body_sent = False
+
+        async def replay_receive():
+            # 请求体已经读出，交给接口时重新提供一次
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = None
+        response_headers = []
+        chunks = []
+        size = 0
+
+        async def send_and_capture(message):
+            nonlocal status_code, response_headers, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = [[name.decode("latin-1"), value.decode("latin-1")]
+                                    for name, value in message.get("headers", [])]
+            elif message["type"] == "http.response.body" and size <= settings.idempotency_max_body_bytes:
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, send_and_capture)
+        except BaseException:
+            await run_in_threadpool(self.store.release, key)
+            raise
+
+        if status_code is not None and status_code < 500 and size <= settings.idempotency_max_body_bytes:
+            await run_in_threadpool(
+                self.store.save, key, status_code, response_headers, b"".join(chunks),
+                settings.idempotency_ttl_seconds,
+            )
+        else:
+            await run_in_threadpool(self.store.release, key)
+
+    async def _respond_stored(self, stored: StoredResponse, fingerprint: str, scope, receive, send):
+        if stored.fingerprint != fingerprint:
+            response = JSONResponse({"detail": "Idempotency-Key was used for a different request"}, status_code=422)
+        elif stored.status_code is None:
+            response = JSONResponse(
+                {"detail": "A request with this Idempotency-Key is still in progress"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+        else:
+            headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+            headers.append((REPLAYED_HEADER.lower().encode(), b"true"))
+            await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+        await response(scope, receive, send)
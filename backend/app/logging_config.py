@@ -0,0 +1,104 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from .config import settings
+
+# LogRecord 自带的属性，其余属性视为 extra 结构化字段
+_RESERVED_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """按比例采样低于 WARNING 的日志，WARNING 及以上总是保留"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+def _parse_levels(spec: str) -> dict:
+    """解析 "app.auth=DEBUG,app.crud=WARNING" 形式的日志级别配置"""
+    levels = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging():
+    """
+    配置 app 包的日志：记录先进入内存队列，由后台线程格式化为 JSON 并写出，
+    请求线程不会阻塞在 stdout 上。重复调用不会重复添加处理器。
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.log_level.upper())
+    app_logger.addHandler(_queue_handler)
+    app_logger.propagate = False
+
+    for name, level in _parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    # 认证相关日志频率很高，只保留一部分
+    logging.getLogger("app.auth").addFilter(SamplingFilter(settings.auth_log_sample_rate))
+
+def stop_logging():
+    """写出队列中剩余的日志并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def _restart_after_fork():
+    # fork 出的子进程（app.serve 的工作进程）中没有日志线程，换一个新队列重新启动
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    _queue_handler.queue = log_queue
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
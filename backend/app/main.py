@@ -1,11 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from .routers import auth, events, orders, comments
-from .database import engine
-from . import models
+from .database import async_engine, engine, get_database_settings
+from .config import settings
+from . import hashing
+from .logging_config import setup_logging
+from .token_cache import token_cache
+from .cache import response_cache
+from .metrics import MetricsMiddleware, install_query_hooks, metrics
+from .idempotency import IdempotencyMiddleware, idempotency_store
+from .rate_limit import RateLimitMiddleware, rate_limiter
 
-# 创建数据库表
-models.Base.metadata.create_all(bind=engine)
+setup_logging()
+
+# 数据库表和迁移由启动入口（app.serve、run.py、init_db.py）在加载应用前执行，
+# 多进程部署时只在主进程中执行一次
 
 app = FastAPI(
     title="体育活动平台 API",
@@ -13,6 +23,14 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# 写接口的幂等键（最先添加，位于 CORS 之内，重放的响应同样带有 CORS 响应头）
+if idempotency_store is not None:
+    app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
+# 限流（位于 CORS 之内，浏览器能读到 429 响应；在幂等键之外，被拒绝的请求不会写库）
+if rate_limiter is not None:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # 添加 CORS 中间件
 app.add_middleware(
     CORSMiddleware,
@@ -20,8 +38,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "Server-Timing", "Idempotent-Replayed"],
 )
 
+# 请求耗时和查询统计（在 CORS 之后添加，位于更外层，预检请求也会被统计）
+if settings.metrics_enabled:
+    install_query_hooks(engine)
+    if async_engine is not None:
+        install_query_hooks(async_engine.sync_engine)
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(hashing.PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: hashing.PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry later"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    hashing.shutdown()
+
 # 包含路由
 app.include_router(auth.router)
 app.include_router(events.router)
@@ -34,4 +72,16 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "database": get_database_settings(),
+        "token_cache": token_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else {"backend": "none"},
+        "idempotency": idempotency_store.stats() if idempotency_store is not None else {"backend": "none"},
+    }
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Prometheus 文本格式的请求和查询统计"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,224 @@
+"""
+请求耗时和数据库查询统计
+- MetricsMiddleware：按路由记录请求耗时直方图，并在响应头中加入 Server-Timing
+- install_query_hooks：通过 before/after_cursor_execute 统计每个请求的查询次数和数据库耗时，
+  同一条语句在一个请求中执行次数达到阈值时记为疑似 N+1
+- metrics.render()：/metrics 接口输出的 Prometheus 文本格式
+"""
+
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# 未匹配到路由（404 等）的请求统一记在一个标签下，避免任意路径撑大指标数量
+UNMATCHED_ROUTE = "<unmatched>"
+
+class RequestStats:
+    """单个请求内的查询统计，由 contextvar 传递到线程池中执行的 crud 函数"""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+
+    def most_repeated(self):
+        """执行次数最多的语句及其次数"""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+_current_stats = contextvars.ContextVar("request_stats", default=None)
+
+def current_stats():
+    return _current_stats.get()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class CounterMetric:
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, labels=(), amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def clear(self):
+        self.values.clear()
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+class HistogramMetric:
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [各区间计数..., 总和]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def clear(self):
+        self.series.clear()
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(series[-1])}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}"
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        route_labels = ("method", "route")
+        self.requests = CounterMetric(
+            "http_requests_total", "HTTP 请求数", ("method", "route", "status"))
+        self.latency = HistogramMetric(
+            "http_request_duration_seconds", "HTTP 请求耗时（秒）", route_labels)
+        self.queries = HistogramMetric(
+            "http_request_db_queries", "每个请求执行的 SQL 语句数", route_labels, QUERY_COUNT_BUCKETS)
+        self.db_time = HistogramMetric(
+            "http_request_db_duration_seconds", "每个请求的数据库耗时（秒）", route_labels)
+        self.n_plus_one = CounterMetric(
+            "http_request_n_plus_one_total", "同一语句重复执行次数达到阈值的请求数（疑似 N+1）", route_labels)
+        self._metrics = (self.requests, self.latency, self.queries, self.db_time, self.n_plus_one)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        labels = (method, route)
+        statement, repeated = stats.most_repeated()
+        suspected = repeated >= settings.n_plus_one_threshold > 0
+        with self._lock:
+            self.requests.inc((method, route, str(status)))
+            self.latency.observe(labels, seconds)
+            self.queries.observe(labels, stats.queries)
+            self.db_time.observe(labels, stats.db_seconds)
+            if suspected:
+                self.n_plus_one.inc(labels)
+        if suspected:
+            logger.warning("疑似 N+1 查询", extra={
+                "route": f"{method} {route}",
+                "repeated": repeated,
+                "queries": stats.queries,
+                "statement": " ".join(statement.split())[:200],
+            })
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [line for metric in self._metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            for metric in self._metrics:
+                metric.clear()
+
+metrics = MetricsRegistry()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.get("query_started")
+    if stats is not None and started:
+        stats.record(statement, time.perf_counter() - started.pop())
+
+def _handle_error(context):
+    # 执行出错时没有 after_cursor_execute，丢弃对应的开始时间
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if _current_stats.get() is not None and started:
+        started.pop()
+
+def install_query_hooks(target_engine):
+    """为引擎注册查询统计钩子（异步引擎传入其 sync_engine），重复调用不会重复注册"""
+    if not event.contains(target_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target_engine, "handle_error", _handle_error)
+    return target_engine
+
+def _route_label(scope) -> str:
+    # FastAPI 在匹配到路由后把路由对象写入 scope，使用路径模板而不是实际路径作为标签
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+def _server_timing(seconds: float, stats: RequestStats) -> str:
+    return f'app;dur={seconds * 1000:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"'
+
+class MetricsMiddleware:
+    """记录每个请求的耗时和查询统计；Server-Timing 中的耗时截止到响应头发出时"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if settings.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", _server_timing(time.perf_counter() - started, stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            metrics.observe_request(scope["method"], _route_label(scope), status, time.perf_counter() - started, stats)
@@ -0,0 +1,153 @@
+"""
+数据库迁移
+按版本号顺序执行尚未应用的迁移，已应用的版本记录在 schema_migrations 表中。
+每个迁移都可以重复执行（先检查再修改），新建的数据库由 create_all 建好表后同样走一遍。
+
+用法: python -m app.migrations [status]
+"""
+
+import sys
+
+from sqlalchemy import inspect, text
+
+from . import fulltext
+
+def _recount_registrations(conn):
+    conn.execute(text(
+        "UPDATE events SET registered_count = ("
+        "SELECT COUNT(orders.id) FROM orders "
+        "WHERE orders.event_id = events.id AND orders.status = 'active')"
+    ))
+
+def _add_registered_count(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("events")}
+    if "registered_count" not in columns:
+        conn.execute(text("ALTER TABLE events ADD COLUMN registered_count INTEGER NOT NULL DEFAULT 0"))
+    _recount_registrations(conn)
+
+def _add_active_order_unique_index(conn):
+    # 旧版本的报名不是原子的，并发时可能为同一用户和活动写入多条有效订单；
+    # 只保留最早的一条，其余取消并重新统计报名人数，否则唯一索引无法建立
+    duplicates = conn.execute(text(
+        "UPDATE orders SET status = 'cancelled', cancelled_at = CURRENT_TIMESTAMP "
+        "WHERE status = 'active' AND EXISTS ("
+        "SELECT 1 FROM orders AS earlier WHERE earlier.user_id = orders.user_id "
+        "AND earlier.event_id = orders.event_id AND earlier.status = 'active' AND earlier.id < orders.id)"
+    ))
+    if duplicates.rowcount:
+        _recount_registrations(conn)
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_orders_active_user_event "
+        "ON orders (user_id, event_id) WHERE status = 'active'"
+    ))
+
+def _add_event_listing_index(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_events_status_event_time_id ON events (status, event_time, id)"
+    ))
+
+def _add_event_fulltext_index(conn):
+    fulltext.setup_fts(conn)
+
+def _add_hot_query_indexes(conn):
+    for ddl in [
+        "CREATE INDEX IF NOT EXISTS ix_orders_event_id_status ON orders (event_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_orders_user_id_status ON orders (user_id, status)",
+        "CREATE INDEX IF NOT EXISTS ix_events_creator_id ON events (creator_id)",
+        "CREATE INDEX IF NOT EXISTS ix_comments_event_id_created_at ON comments (event_id, created_at)",
+    ]:
+        conn.execute(text(ddl))
+
+def _add_waitlist_indexes(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_orders_waitlist ON orders (event_id, id) WHERE status = 'waitlisted'"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_orders_waitlisted_user_event "
+        "ON orders (user_id, event_id) WHERE status = 'waitlisted'"
+    ))
+
+def _merge_open_order_unique_indexes(conn):
+    # 有效订单和候补订单分属两个唯一索引时，同一用户可能同时持有两种订单；
+    # 先取消这类重复的候补订单，再换成覆盖两种状态的一个唯一索引
+    conn.execute(text(
+        "UPDATE orders SET status = 'cancelled', cancelled_at = CURRENT_TIMESTAMP "
+        "WHERE status = 'waitlisted' AND EXISTS ("
+        "SELECT 1 FROM orders AS active WHERE active.user_id = orders.user_id "
+        "AND active.event_id = orders.event_id AND active.status = 'active')"
+    ))
+    conn.execute(text("DROP INDEX IF EXISTS uq_orders_active_user_event"))
+    conn.execute(text("DROP INDEX IF EXISTS uq_orders_waitlisted_user_event"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_orders_open_user_event "
+        "ON orders (user_id, event_id) WHERE status IN ('active', 'waitlisted')"
+    ))
+
+def _normalize_comment_timestamps(conn):
+    # 旧版本由 CURRENT_TIMESTAMP 写入的 created_at 没有微秒部分，与应用写入的文本格式不同，
+    # 按游标比较时会错位；补齐为相同格式。其他数据库使用原生时间类型，不需要处理
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(
+            "UPDATE comments SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+        ))
+
+# (版本号, 名称, 迁移函数)，只能在末尾追加
+MIGRATIONS = [
+    (1, "add events.registered_count", _add_registered_count),
+    (2, "add unique index on active orders", _add_active_order_unique_index),
+    (3, "add events (status, event_time, id) index", _add_event_listing_index),
+    (4, "add events full-text index", _add_event_fulltext_index),
+    (5, "add indexes for hot query shapes", _add_hot_query_indexes),
+    (6, "add order waitlist indexes", _add_waitlist_indexes),
+    (7, "merge active and waitlisted order unique indexes", _merge_open_order_unique_indexes),
+    (8, "normalize comments.created_at format", _normalize_comment_timestamps),
+]
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(200) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+def upgrade(engine):
+    """执行所有未应用的迁移，返回本次应用的版本号列表"""
+    done = applied_versions(engine)
+    applied = []
+
+    for version, name, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": name}
+            )
+        applied.append(version)
+
+    return applied
+
+def main():
+    from .database import engine
+    from . import schema
+
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        done = applied_versions(engine)
+        for version, name, _ in MIGRATIONS:
+            print(f"[{'x' if version in done else ' '}] {version:04d} {name}")
+        return
+
+    applied = schema.upgrade_schema(engine)
+    if applied:
+        print(f"已应用迁移: {', '.join(f'{version:04d}' for version in applied)}")
+    else:
+        print("数据库已是最新版本")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Table
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, LargeBinary, ForeignKey, Table, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -34,7 +36,8 @@ class Event(Base):
     capacity = Column(Integer, nullable=False)
     price = Column(Integer, default=0)  # 以分为单位存储
     status = Column(String(20), default="active")  # active, cancelled, completed
-    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    registered_count = Column(Integer, nullable=False, default=0, server_default="0")  # 有效报名人数，随订单变化维护
+    creator_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -43,6 +46,11 @@ class Event(Base):
     orders = relationship("Order", back_populates="event")
     comments = relationship("Comment", back_populates="event")
 
+    __table_args__ = (
+        # 活动列表按状态过滤、按 (event_time, id) 排序和游标分页
+        Index("ix_events_status_event_time_id", "status", "event_time", "id"),
+    )
+
 # 订单模型
 class Order(Base):
     __tablename__ = "orders"
@@ -50,7 +58,7 @@ class Order(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
-    status = Column(String(20), default="active")  # active, cancelled
+    status = Column(String(20), default="active")  # active, waitlisted, cancelled
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     cancelled_at = Column(DateTime(timezone=True))
 
@@ -58,6 +66,29 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     event = relationship("Event", back_populates="orders")
 
+    __table_args__ = (
+        Index("ix_orders_event_id_status", "event_id", "status"),
+        Index("ix_orders_user_id_status", "user_id", "status"),
+        # 同一用户对同一活动最多只有一个有效或候补订单（两种状态共用一个唯一索引，
+        # 并发的报名和候补请求不会为同一用户各插入一个订单）
+        Index(
+            "uq_orders_open_user_event",
+            "user_id",
+            "event_id",
+            unique=True,
+            sqlite_where=text("status IN ('active', 'waitlisted')"),
+            postgresql_where=text("status IN ('active', 'waitlisted')"),
+        ),
+        # 候补队列：按 id 先后排队，队首和排位都走这个部分索引
+        Index(
+            "ix_orders_waitlist",
+            "event_id",
+            "id",
+            sqlite_where=text("status = 'waitlisted'"),
+            postgresql_where=text("status = 'waitlisted'"),
+        ),
+    )
+
 # 评论模型
 class Comment(Base):
     __tablename__ = "comments"
@@ -66,8 +97,24 @@ class Comment(Base):
     content = Column(Text, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 由应用写入而不是 CURRENT_TIMESTAMP：SQLite 以文本存储时间，所有值都带微秒才能按游标正确比较
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
     # 关系
     user = relationship("User", back_populates="comments")
     event = relationship("Event", back_populates="comments")
+
+    __table_args__ = (
+        Index("ix_comments_event_id_created_at", "event_id", "created_at"),
+    )
+
+# 幂等键：保存写接口第一次请求的响应，客户端带相同 Idempotency-Key 重试时直接重放
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(64), primary_key=True)  # 调用方凭据和 Idempotency-Key 的哈希
+    fingerprint = Column(String(64), nullable=False)  # 请求方法、路径、查询参数和请求体的哈希
+    status_code = Column(Integer)  # 为空表示第一次请求仍在处理中
+    headers = Column(Text)  # JSON 编码的响应头列表
+    body = Column(LargeBinary)
+    expires_at = Column(Float, nullable=False, index=True)  # Unix 时间戳
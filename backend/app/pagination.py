@@ -0,0 +1,17 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """将排序键 (时间, id)（活动为 event_time，评论为 created_at）编码为不透明的游标字符串"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解析游标，格式不正确时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,241 @@
+"""
+令牌桶限流
+- 已登录用户按用户 id 计数（从令牌缓存中直接取，不解码 JWT），其他请求按客户端 IP 计数；
+  开启 RATE_LIMIT_TRUST_X_REAL_IP 后，直连地址属于受信任代理（如 nginx）的请求改用其设置的 X-Real-IP
+- 每条规则是一个独立的令牌桶，规则写在 RATE_LIMITS 中，如 "POST /auth/login=10/60" 表示
+  每 60 秒补满 10 个令牌（允许 10 次突发），路径中的 {参数} 匹配任意一段；未匹配规则的请求共用默认额度
+- 超出额度返回 429 和 Retry-After
+- 默认使用进程内分片存储，多进程部署时可改用 Redis 共享计数
+"""
+
+import ipaddress
+import math
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from starlette.responses import JSONResponse
+
+from .config import settings
+from .token_cache import token_cache
+
+class Budget(NamedTuple):
+    name: str
+    capacity: float  # 桶容量，即允许的突发请求数
+    rate: float  # 每秒补充的令牌数
+
+def parse_budget(name: str, spec: str) -> Budget:
+    """解析 "次数/秒数" 形式的额度"""
+    try:
+        count, seconds = spec.split("/")
+        capacity, period = float(count), float(seconds)
+    except ValueError:
+        raise ValueError(f"无效的限流额度: {spec!r}，应为 次数/秒数") from None
+    if capacity < 1 or period <= 0:
+        raise ValueError(f"无效的限流额度: {spec!r}")
+    return Budget(name, capacity, capacity / period)
+
+def _normalize_path(path: str) -> str:
+    return path.rstrip("/") or "/"
+
+class MemoryStore:
+    """进程内令牌桶，按键哈希分片加锁；每个分片的桶数有上限，超出时先清理已经补满的桶"""
+
+    def __init__(self, shards: int = 16, max_entries: int = 100000):
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+        self._max_per_shard = max(1, max_entries // shards)
+
+    def acquire(self, key: str, capacity: float, rate: float) -> float:
+        """取一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        buckets, lock = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            bucket = buckets.get(key)  # [令牌数, 更新时间, 补满时间]
+            if bucket is None:
+                if len(buckets) >= self._max_per_shard:
+                    self._evict(buckets, now)
+                bucket = buckets[key] = [capacity, now, now]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - bucket[0]) / rate
+            bucket[2] = now + (capacity - bucket[0]) / rate
+            return retry_after
+
+    def _evict(self, buckets: dict, now: float):
+        # 已补满的桶与新建的桶等价，可以直接丢弃；都还在使用时丢弃最早创建的八分之一
+        stale = [key for key, bucket in buckets.items() if bucket[2] <= now]
+        if not stale:
+            stale = list(buckets)[:max(1, len(buckets) // 8)]
+        for key in stale:
+            del buckets[key]
+
+    def clear(self):
+        for buckets, lock in self._shards:
+            with lock:
+                buckets.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "buckets": sum(len(buckets) for buckets, _ in self._shards)}
+
+# 在 Redis 中原子地补充并扣减令牌；Redis 把 Lua 数字转成整数返回，因此等待时间以字符串返回
+_ACQUIRE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+class RedisStore:
+    """多个工作进程共享的令牌桶，桶在补满后自动过期"""
+
+    def __init__(self, client, prefix: str = "sports:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+
+    def acquire(self, key: str, capacity: float, rate: float) -> float:
+        return float(self._acquire(keys=[self.prefix + key], args=[capacity, rate, time.time()]))
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+class RateLimiter:
+    def __init__(self, store, default: str, rules: str = "", exempt_paths: str = ""):
+        self.store = store
+        self.default = parse_budget("default", default)
+        self._exact = {}  # (方法, 路径) -> Budget
+        self._patterns = []  # (方法, 正则, Budget)
+        for item in filter(None, (part.strip() for part in rules.split(","))):
+            route, _, spec = item.partition("=")
+            method, _, path = route.strip().partition(" ")
+            method, path = method.upper(), _normalize_path(path.strip())
+            budget = parse_budget(f"{method} {path}", spec.strip())
+            if "{" in path:
+                pattern = re.compile("^" + re.sub(r"\\{[^/]+?\\}", "[^/]+", re.escape(path)) + "$")
+                self._patterns.append((method, pattern, budget))
+            else:
+                self._exact[(method, path)] = budget
+        self.exempt = {_normalize_path(path.strip()) for path in exempt_paths.split(",") if path.strip()}
+        self.limited = 0
+
+    def budget_for(self, method: str, path: str) -> Optional[Budget]:
+        """请求适用的额度，豁免的路径返回 None"""
+        path = _normalize_path(path)
+        if path in self.exempt:
+            return None
+        budget = self._exact.get((method, path))
+        if budget is not None:
+            return budget
+        for rule_method, pattern, budget in self._patterns:
+            if rule_method == method and pattern.match(path):
+                return budget
+        return self.default
+
+    def check(self, identity: str, method: str, path: str) -> float:
+        """返回 0 表示放行，否则为建议的重试等待秒数"""
+        budget = self.budget_for(method, path)
+        if budget is None:
+            return 0.0
+        retry_after = self.store.acquire(f"{budget.name}|{identity}", budget.capacity, budget.rate)
+        if retry_after:
+            self.limited += 1
+        return retry_after
+
+    def stats(self) -> dict:
+        stats = {"limited": self.limited}
+        stats.update(self.store.stats())
+        return stats
+
+@lru_cache(maxsize=8)
+def _trusted_networks(spec: str):
+    return tuple(ipaddress.ip_network(item.strip(), strict=False) for item in spec.split(",") if item.strip())
+
+def _is_trusted_proxy(host: Optional[str]) -> bool:
+    if not host:
+        return False
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _trusted_networks(settings.rate_limit_trusted_proxies))
+
+def client_identity(scope) -> str:
+    """限流计数的主体：令牌缓存中已有的用户，否则为客户端 IP"""
+    authorization = real_ip = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            authorization = value
+        elif name == b"x-real-ip":
+            real_ip = value
+    # 只认令牌缓存里的用户（即已经通过 get_current_user 校验过的令牌），伪造的令牌仍按 IP 计数
+    if authorization is not None and authorization[:7].lower() == b"bearer ":
+        principal = token_cache.peek(authorization[7:].decode("latin-1"))
+        if principal is not None:
+            return f"user:{principal.id}"
+    client = scope.get("client")
+    peer = client[0] if client else None
+    # X-Real-IP 只在请求来自受信任的反向代理时可信，否则每个请求都能伪造出一个新的桶
+    if real_ip and settings.rate_limit_trust_x_real_ip and _is_trusted_proxy(peer):
+        return "ip:" + real_ip.decode("latin-1")
+    return f"ip:{peer or 'unknown'}"
+
+def _create_store():
+    backend = settings.rate_limit_backend.lower()
+    if backend == "memory":
+        return MemoryStore(settings.rate_limit_shards, settings.rate_limit_max_entries)
+    if backend == "redis":
+        import redis  # 可选依赖，仅在使用 Redis 时需要
+        return RedisStore(redis.Redis.from_url(settings.rate_limit_redis_url))
+    return None
+
+def _create_limiter():
+    store = _create_store()
+    if store is None:
+        return None
+    return RateLimiter(store, settings.rate_limit_default, settings.rate_limits, settings.rate_limit_exempt_paths)
+
+rate_limiter = _create_limiter()
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter = None):
+        self.app = app
+        self.limiter = limiter if limiter is not None else rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        # CORS 预检请求不计数
+        if scope["type"] != "http" or self.limiter is None or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        retry_after = self.limiter.check(client_identity(scope), scope["method"], scope["path"])
+        if retry_after:
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
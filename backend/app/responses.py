@@ -0,0 +1,86 @@
+"""
+高吞吐的 JSON 响应（FAST_JSON=True 时启用，需要 orjson）
+开启后各路由默认使用 orjson 编码响应，列表接口直接由查询得到的行元组构造响应，
+不再经过 ORM 对象和 Pydantic 校验。
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, List, Tuple, Type, get_args
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+from . import crud
+from .config import settings
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+def fast_json_enabled() -> bool:
+    return settings.fast_json and orjson is not None
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        # 与 Pydantic 一致：UTC 时间以 Z 结尾
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return JSONResponse(content).body
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# 各路由的默认响应类
+default_response_class = FastJSONResponse if fast_json_enabled() else JSONResponse
+
+@lru_cache(maxsize=None)
+def _field_plan(schema: Type[BaseModel], prefix: str = "") -> Tuple:
+    """按响应模型的字段顺序列出 (字段名, 行中的列名或嵌套模型的字段计划)"""
+    plan = []
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            # 嵌套对象的列以 "字段名__" 为前缀，如 creator__username
+            plan.append((name, _field_plan(annotation, f"{prefix}{name}__")))
+        else:
+            plan.append((name, f"{prefix}{name}"))
+    return tuple(plan)
+
+def _build(mapping, plan) -> dict:
+    return {
+        name: mapping[source] if isinstance(source, str) else _build(mapping, source)
+        for name, source in plan
+    }
+
+def row_payload(row, schema: Type[BaseModel]) -> dict:
+    """按响应模型的字段从行元组构造字典（不做类型校验，列类型与模型一致由查询保证）"""
+    return _build(row._mapping, _field_plan(schema))
+
+def rows_payload(rows: Iterable, schema: Type[BaseModel]) -> List[dict]:
+    plan = _field_plan(schema)
+    return [_build(row._mapping, plan) for row in rows]
+
+def query_view(view: str) -> str:
+    """接口的 view 参数（full / summary）对应的 crud 列表查询返回形式"""
+    if view == "summary":
+        return crud.VIEW_SUMMARY
+    return crud.VIEW_ROWS if fast_json_enabled() else crud.VIEW_ORM
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+def render_list(items: Iterable, schema: Type[BaseModel]) -> bytes:
+    """把 ORM 对象或行元组列表编码为 JSON，只经过一次 Pydantic（或在快速模式下完全不经过）"""
+    if fast_json_enabled():
+        return dumps(rows_payload(items, schema))
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+def render_page(page_schema: Type[BaseModel], items: Iterable, **fields) -> bytes:
+    """编码分页响应，fields 为除 items 以外的字段"""
+    if fast_json_enabled():
+        item_schema = get_args(page_schema.model_fields["items"].annotation)[0]
+        return dumps({"items": rows_payload(items, item_schema), **fields})
+    return page_schema.model_validate({"items": items, **fields}, from_attributes=True).model_dump_json().encode()
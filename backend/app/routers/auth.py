@@ -3,17 +3,19 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
 
-from .. import crud, schemas, auth, dependencies
-from ..database import get_db
+from .. import crud, schemas, auth, dependencies, hashing
+from ..database import get_session, run
+from ..responses import default_response_class
 from ..config import settings
+from ..token_cache import token_cache
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], default_response_class=default_response_class)
 
 @router.post("/register", response_model=schemas.UserOut)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: Session = Depends(get_session)):
     """用户注册"""
     # 检查用户名是否存在
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await run(db, crud.get_user_by_username, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=400,
@@ -21,27 +23,37 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # 检查邮箱是否存在
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await run(db, crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    return crud.create_user(db=db, user=user)
+    # bcrypt 在独立进程中计算，不占用 GIL
+    hashed_password = await hashing.hash_password(user.password)
+    return await run(db, crud.create_user, user=user, hashed_password=hashed_password)
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
     """用户登录"""
-    user = crud.get_user_by_username(db, username=form_data.username)
+    user = await run(db, crud.get_user_by_username, username=form_data.username)
     
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await hashing.verify_password(form_data.password, user.hashed_password)
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # 哈希参数调整后，在登录时透明地升级旧哈希
+    if new_hash:
+        await run(db, crud.update_user_password_hash, user_id=user.id, hashed_password=new_hash)
+    
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = auth.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -50,6 +62,18 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.UserOut)
-def read_users_me(current_user = Depends(dependencies.get_current_active_user)):
+async def read_users_me(
+    current_user = Depends(dependencies.get_current_active_user),
+    db: Session = Depends(get_session)
+):
     """获取当前用户信息"""
-    return current_user
+    user = await run(db, crud.get_user, user_id=current_user.id)
+    if user is None:
+        # 用户在 ORM 之外被删除时缓存不会失效，令牌仍能通过校验；此时丢弃缓存并按未认证处理
+        token_cache.invalidate_user(current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -1,44 +1,115 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional, Union
 
-from .. import crud, schemas, dependencies
-from ..database import get_db
+from .. import crud, schemas, dependencies, conditional, pagination, responses
+from ..database import SessionLocal, get_session, run
+from ..responses import default_response_class
+from ..cache import response_cache
 
-router = APIRouter(prefix="/comments", tags=["comments"])
+DEFAULT_COMMENT_PAGE_SIZE = 50
+
+router = APIRouter(prefix="/comments", tags=["comments"], default_response_class=default_response_class)
 
 @router.post("/", response_model=schemas.CommentOut)
-def create_comment(
+async def create_comment(
     comment: schemas.CommentCreate,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """创建评论"""
     # 检查活动是否存在
-    db_event = crud.get_event(db, event_id=comment.event_id)
+    db_event = await run(db, crud.get_event, event_id=comment.event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    return crud.create_comment(db=db, comment=comment, user_id=current_user.id)
+    return await run(db, crud.create_comment, comment=comment, user_id=current_user.id)
 
-@router.get("/events/{event_id}", response_model=List[schemas.CommentOut])
-def read_event_comments(event_id: int, db: Session = Depends(get_db)):
-    """获取活动的所有评论"""
+@router.get("/events/{event_id}", response_model=Union[List[schemas.CommentOut], List[schemas.CommentSummary]])
+async def read_event_comments(
+    event_id: int,
+    request: Request,
+    limit: int = Query(DEFAULT_COMMENT_PAGE_SIZE, ge=1, le=200, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="游标（上一页响应头 X-Next-Cursor 的值）"),
+    view: Literal["full", "summary"] = Query("full", description="summary 只返回评论者的用户名而不是完整用户信息"),
+    db: Session = Depends(get_session)
+):
+    """
+    按时间顺序分页获取活动的评论。
+    还有下一页时响应头 X-Next-Cursor 给出游标，Link 给出下一页地址；需要全部评论时使用 /stream。
+    """
+    after = None
+    if cursor:
+        try:
+            after = pagination.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    cache_key = response_cache.event_comments_key(event_id, {"limit": limit, "cursor": cursor, "view": view})
+    cached = response_cache.get_response(cache_key)
+    if cached is not None:
+        etag, _, headers, body = cached
+        if conditional.is_not_modified(request, etag):
+            return conditional.not_modified(etag)
+        return conditional.json_response(body, etag, headers=headers)
+    
     # 检查活动是否存在
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run(db, crud.get_event, event_id=event_id)
+    if db_event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    # 多取一条用于判断是否还有下一页
+    comments = await run(
+        db, crud.get_event_comments, event_id=event_id, limit=limit + 1, after=after,
+        view=responses.query_view(view)
+    )
+    next_cursor = None
+    if len(comments) > limit:
+        comments = comments[:limit]
+        next_cursor = pagination.encode_cursor(comments[-1].created_at, comments[-1].id)
+    
+    # 评论不可编辑，由 id 和创建时间即可判断变化（删除评论不推进时间戳，因此不提供 Last-Modified）
+    etag = conditional.make_etag(f"comments:{view}", comments, next_cursor)
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
+    
+    headers = {}
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers = {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
+    
+    body = responses.render_list(comments, schemas.CommentSummary if view == "summary" else schemas.CommentOut)
+    response_cache.set_response(cache_key, etag, None, body, headers)
+    return conditional.json_response(body, etag, headers=headers)
+
+@router.get("/events/{event_id}/stream")
+async def stream_event_comments(event_id: int, db: Session = Depends(get_session)):
+    """以 NDJSON（每行一条评论）流式返回活动的全部评论"""
+    db_event = await run(db, crud.get_event, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    return crud.get_event_comments(db=db, event_id=event_id)
+    return StreamingResponse(_comment_lines(event_id), media_type="application/x-ndjson")
+
+def _comment_lines(event_id: int):
+    # 同步生成器由 Starlette 放到线程池中迭代；
+    # 使用独立的会话，因为请求的会话可能在响应发送完之前就被关闭
+    db = SessionLocal()
+    try:
+        for comment in crud.iter_event_comments(db, event_id):
+            yield schemas.CommentOut.model_validate(comment).model_dump_json() + "\n"
+    finally:
+        db.close()
 
 @router.delete("/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_comment(
+async def delete_comment(
     comment_id: int,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """删除评论"""
-    deleted_comment = crud.delete_comment(db=db, comment_id=comment_id, user_id=current_user.id)
+    deleted_comment = await run(db, crud.delete_comment, comment_id=comment_id, user_id=current_user.id)
     if deleted_comment is None:
         raise HTTPException(
             status_code=404, 
@@ -1,30 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 from datetime import datetime
 import math
 
-from .. import crud, schemas, dependencies
-from ..database import get_db
+from .. import crud, schemas, dependencies, pagination, conditional, responses
+from ..database import get_session, run
+from ..responses import default_response_class
+from ..cache import response_cache
 
-router = APIRouter(prefix="/events", tags=["events"])
+router = APIRouter(prefix="/events", tags=["events"], default_response_class=default_response_class)
 
 @router.post("/", response_model=schemas.EventOut)
-def create_event(
+async def create_event(
     event: schemas.EventCreate,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """创建活动"""
-    db_event = crud.create_event(db=db, event=event, creator_id=current_user.id)
-    
-    # 添加注册人数信息
-    db_event.registered_count = crud.get_event_registered_count(db, db_event.id)
-    
-    return db_event
+    return await run(db, crud.create_event, event=event, creator_id=current_user.id)
 
-@router.get("/", response_model=schemas.PaginatedResponse)
-def read_events(
+@router.get("/", response_model=Union[schemas.PaginatedResponse, schemas.EventSummaryPage])
+async def read_events(
+    request: Request,
     search: Optional[str] = Query(None, description="搜索关键词"),
     date_from: Optional[datetime] = Query(None, description="开始日期"),
     date_to: Optional[datetime] = Query(None, description="结束日期"),
@@ -32,118 +30,174 @@ def read_events(
     status: str = Query("active", description="活动状态"),
     page: int = Query(1, ge=1, description="页码"),
     limit: int = Query(10, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="游标（上一页返回的 next_cursor），传入时忽略页码"),
+    include_total: bool = Query(True, description="是否统计总数"),
+    view: Literal["full", "summary"] = Query("full", description="summary 只返回列表字段，不含描述和创建者"),
+    db: Session = Depends(get_session)
 ):
-    """获取活动列表（支持搜索和分页）"""
-    skip = (page - 1) * limit
+    """获取活动列表（支持搜索、分页和游标分页）"""
+    cache_key = response_cache.event_list_key({
+        "search": search,
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "location": location,
+        "status": status,
+        "page": None if cursor else page,
+        "limit": limit,
+        "cursor": cursor,
+        "include_total": include_total,
+        "view": view,
+    })
+    cached = response_cache.get_response(cache_key)
+    if cached is not None:
+        etag, _, _, body = cached
+        if conditional.is_not_modified(request, etag):
+            return conditional.not_modified(etag)
+        return conditional.json_response(body, etag)
+    
+    after = None
+    if cursor:
+        # 关键词检索按相关度排序，无法使用 (event_time, id) 游标
+        if search:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported with search")
+        try:
+            after = pagination.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    events = crud.get_events(
-        db=db,
+    skip = 0 if after else (page - 1) * limit
+    
+    # 多取一条用于判断是否还有下一页
+    events = await run(
+        db,
+        crud.get_events,
         search=search,
         date_from=date_from,
         date_to=date_to,
         location=location,
         status=status,
         skip=skip,
-        limit=limit
+        limit=limit + 1,
+        after=after,
+        view=responses.query_view(view)
     )
     
-    total = crud.get_events_count(
-        db=db,
-        search=search,
-        date_from=date_from,
-        date_to=date_to,
-        location=location,
-        status=status
-    )
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        if not search:
+            next_cursor = pagination.encode_cursor(events[-1].event_time, events[-1].id)
     
-    # 为每个活动添加注册人数
-    for event in events:
-        event.registered_count = crud.get_event_registered_count(db, event.id)
+    total = None
+    pages = None
+    if include_total:
+        total = await run(
+            db,
+            crud.get_events_count,
+            search=search,
+            date_from=date_from,
+            date_to=date_to,
+            location=location,
+            status=status
+        )
+        pages = math.ceil(total / limit)
     
-    pages = math.ceil(total / limit)
+    # 列表中删除的活动不会推进任何时间戳，因此列表只提供 ETag
+    etag = conditional.make_etag(f"events:{view}", events, total, next_cursor)
+    if conditional.is_not_modified(request, etag):
+        return conditional.not_modified(etag)
     
-    return {
-        "items": events,
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": pages
-    }
+    body = responses.render_page(
+        schemas.EventSummaryPage if view == "summary" else schemas.PaginatedResponse,
+        events,
+        total=total,
+        page=page,
+        limit=limit,
+        pages=pages,
+        next_cursor=next_cursor
+    )
+    response_cache.set_response(cache_key, etag, None, body)
+    return conditional.json_response(body, etag)
 
-@router.get("/my", response_model=List[schemas.EventOut])
-def read_my_events(
+@router.get("/my", response_model=Union[List[schemas.EventOut], List[schemas.EventSummary]])
+async def read_my_events(
+    view: Literal["full", "summary"] = Query("full", description="summary 只返回列表字段，不含描述和创建者"),
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """获取当前用户创建的活动"""
-    events = crud.get_user_events(db=db, user_id=current_user.id)
-    
-    # 为每个活动添加注册人数
-    for event in events:
-        event.registered_count = crud.get_event_registered_count(db, event.id)
-    
-    return events
+    events = await run(db, crud.get_user_events, user_id=current_user.id, view=responses.query_view(view))
+    schema = schemas.EventSummary if view == "summary" else schemas.EventOut
+    return Response(content=responses.render_list(events, schema), media_type="application/json")
 
 @router.get("/{event_id}", response_model=schemas.EventOut)
-def read_event(event_id: int, db: Session = Depends(get_db)):
+async def read_event(event_id: int, request: Request, db: Session = Depends(get_session)):
     """获取活动详情"""
-    db_event = crud.get_event(db, event_id=event_id)
+    cache_key = response_cache.event_detail_key(event_id)
+    cached = response_cache.get_response(cache_key)
+    if cached is not None:
+        etag, modified, _, body = cached
+        if conditional.is_not_modified(request, etag, modified):
+            return conditional.not_modified(etag, modified)
+        return conditional.json_response(body, etag, modified)
+    
+    db_event = await run(db, crud.get_event_detail, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    # 添加注册人数信息
-    db_event.registered_count = crud.get_event_registered_count(db, event_id)
+    etag = conditional.make_etag("event", [db_event])
+    modified = conditional.last_modified(db_event)
+    if conditional.is_not_modified(request, etag, modified):
+        return conditional.not_modified(etag, modified)
     
-    return db_event
+    body = schemas.EventOut.model_validate(db_event).model_dump_json().encode()
+    response_cache.set_response(cache_key, etag, modified, body)
+    return conditional.json_response(body, etag, modified)
 
 @router.put("/{event_id}", response_model=schemas.EventOut)
-def update_event(
+async def update_event(
     event_id: int,
     event_update: schemas.EventUpdate,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """更新活动"""
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run(db, crud.get_event, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
     if db_event.creator_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    updated_event = crud.update_event(db=db, event_id=event_id, event_update=event_update)
-    
-    # 添加注册人数信息
-    updated_event.registered_count = crud.get_event_registered_count(db, event_id)
-    
-    return updated_event
+    return await run(db, crud.update_event, event_id=event_id, event_update=event_update)
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event(
+async def delete_event(
     event_id: int,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """删除活动"""
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run(db, crud.get_event, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
     if db_event.creator_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    crud.delete_event(db=db, event_id=event_id)
+    await run(db, crud.delete_event, event_id=event_id)
 
 @router.post("/{event_id}/register", response_model=schemas.OrderOut)
-def register_for_event(
+async def register_for_event(
     event_id: int,
+    response: Response,
+    waitlist: bool = Query(False, description="活动已满时加入候补队列，有人取消后按先后顺序自动转正"),
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """报名参加活动"""
     # 检查活动是否存在
-    db_event = crud.get_event(db, event_id=event_id)
+    db_event = await run(db, crud.get_event, event_id=event_id)
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
@@ -156,12 +210,71 @@ def register_for_event(
         raise HTTPException(status_code=400, detail="Event has already passed")
     
     # 创建订单
-    db_order = crud.create_order(db=db, user_id=current_user.id, event_id=event_id)
+    outcome, db_order = await run(
+        db, crud.register_for_event, user_id=current_user.id, event_id=event_id, waitlist=waitlist
+    )
     
-    if db_order is None:
-        raise HTTPException(
-            status_code=400, 
-            detail="Already registered or event is full"
-        )
+    if outcome == crud.REGISTRATION_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    if outcome == crud.REGISTRATION_INACTIVE:
+        raise HTTPException(status_code=400, detail="Event is not active")
+    
+    if outcome == crud.REGISTRATION_DUPLICATE:
+        raise HTTPException(status_code=400, detail="Already registered for this event")
+    
+    if outcome == crud.REGISTRATION_FULL:
+        raise HTTPException(status_code=400, detail="Event is full")
+    
+    if outcome == crud.REGISTRATION_WAITLISTED:
+        response.status_code = status.HTTP_202_ACCEPTED
     
     return db_order
+
+@router.get("/{event_id}/waitlist/position", response_model=schemas.WaitlistPosition)
+async def read_waitlist_position(
+    event_id: int,
+    current_user = Depends(dependencies.get_current_active_user),
+    db: Session = Depends(get_session)
+):
+    """查询当前用户在活动候补队列中的排位（从 1 开始）"""
+    result = await run(db, crud.get_waitlist_position, user_id=current_user.id, event_id=event_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Not on the waitlist")
+    
+    db_order, position, waiting = result
+    return {"order_id": db_order.id, "event_id": event_id, "position": position, "waiting": waiting}
+
+@router.post("/{event_id}/register/batch", response_model=schemas.BatchRegistrationResult)
+async def register_batch(
+    event_id: int,
+    batch: schemas.BatchRegistrationRequest,
+    current_user = Depends(dependencies.get_current_active_user),
+    db: Session = Depends(get_session)
+):
+    """批量报名（如整队报名）：活动创建者可以为任意用户报名，其他用户只能为自己报名"""
+    db_event = await run(db, crud.get_event, event_id=event_id)
+    if db_event is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    
+    if db_event.status != "active":
+        raise HTTPException(status_code=400, detail="Event is not active")
+    
+    if db_event.event_time < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Event has already passed")
+    
+    if db_event.creator_id != current_user.id and any(user_id != current_user.id for user_id in batch.user_ids):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
+    items = await run(
+        db, crud.register_batch,
+        event_id=event_id, user_ids=batch.user_ids, all_or_nothing=batch.all_or_nothing
+    )
+    return {
+        "event_id": event_id,
+        "created": sum(outcome == crud.REGISTRATION_CREATED for _, outcome, _ in items),
+        "items": [
+            {"user_id": user_id, "outcome": outcome, "order_id": order_id}
+            for user_id, outcome, order_id in items
+        ],
+    }
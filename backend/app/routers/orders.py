@@ -1,28 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Union
 
-from .. import crud, schemas, dependencies
-from ..database import get_db
+from .. import crud, schemas, dependencies, responses
+from ..database import get_session, run
+from ..responses import default_response_class
 
-router = APIRouter(prefix="/orders", tags=["orders"])
+router = APIRouter(prefix="/orders", tags=["orders"], default_response_class=default_response_class)
 
-@router.get("/", response_model=List[schemas.OrderOut])
-def read_my_orders(
+@router.get("/", response_model=Union[List[schemas.OrderOut], List[schemas.OrderSummary]])
+async def read_my_orders(
+    view: Literal["full", "summary"] = Query("full", description="summary 只返回订单和活动的主要字段"),
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """获取当前用户的订单列表"""
-    return crud.get_user_orders(db=db, user_id=current_user.id)
+    orders = await run(db, crud.get_user_orders, user_id=current_user.id, view=responses.query_view(view))
+    schema = schemas.OrderSummary if view == "summary" else schemas.OrderOut
+    return Response(content=responses.render_list(orders, schema), media_type="application/json")
+
+# 需要声明在 /{order_id} 之前，否则 "batch" 会被当作订单 id
+@router.delete("/batch", response_model=schemas.BatchCancellationResult)
+async def cancel_orders(
+    batch: schemas.BatchCancellationRequest,
+    current_user = Depends(dependencies.get_current_active_user),
+    db: Session = Depends(get_session)
+):
+    """批量取消订单，返回每个订单的处理结果"""
+    items = await run(db, crud.cancel_orders, order_ids=batch.order_ids, user_id=current_user.id)
+    return {
+        "cancelled": sum(outcome == crud.CANCELLATION_CANCELLED for _, outcome in items),
+        "items": [{"order_id": order_id, "outcome": outcome} for order_id, outcome in items],
+    }
 
 @router.get("/{order_id}", response_model=schemas.OrderOut)
-def read_order(
+async def read_order(
     order_id: int,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """获取订单详情"""
-    db_order = crud.get_order(db, order_id=order_id)
+    db_order = await run(db, crud.get_order, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -32,20 +50,20 @@ def read_order(
     return db_order
 
 @router.delete("/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-def cancel_order(
+async def cancel_order(
     order_id: int,
     current_user = Depends(dependencies.get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """取消订单"""
-    db_order = crud.get_order(db, order_id=order_id)
+    db_order = await run(db, crud.get_order, order_id=order_id)
     if db_order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
     if db_order.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    if db_order.status != "active":
+    if db_order.status == crud.ORDER_STATUS_CANCELLED:
         raise HTTPException(status_code=400, detail="Order is already cancelled")
     
-    crud.cancel_order(db=db, order_id=order_id, user_id=current_user.id)
+    await run(db, crud.cancel_order, order_id=order_id, user_id=current_user.id)
@@ -0,0 +1,6 @@
+from . import models, migrations
+
+def upgrade_schema(engine):
+    """创建缺失的数据表，并依次执行尚未应用的迁移，返回本次应用的迁移版本号"""
+    models.Base.metadata.create_all(bind=engine)
+    return migrations.upgrade(engine)
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 from typing import Optional, List
 
@@ -81,6 +81,40 @@ class OrderOut(OrderBase):
     class Config:
         from_attributes = True
 
+class WaitlistPosition(BaseModel):
+    order_id: int
+    event_id: int
+    position: int  # 从 1 开始
+    waiting: int  # 队列中的总人数
+
+# 批量报名和批量取消（单次最多 BATCH_MAX_ITEMS 项）
+BATCH_MAX_ITEMS = 100
+
+class BatchRegistrationRequest(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+    all_or_nothing: bool = False  # 为真时只要有一人无法报名，整批都不报名
+
+class BatchRegistrationItem(BaseModel):
+    user_id: int
+    outcome: str
+    order_id: Optional[int] = None
+
+class BatchRegistrationResult(BaseModel):
+    event_id: int
+    created: int
+    items: List[BatchRegistrationItem]
+
+class BatchCancellationRequest(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+class BatchCancellationItem(BaseModel):
+    order_id: int
+    outcome: str
+
+class BatchCancellationResult(BaseModel):
+    cancelled: int
+    items: List[BatchCancellationItem]
+
 # 评论相关 Schemas
 class CommentBase(BaseModel):
     content: str
@@ -98,6 +132,43 @@ class CommentOut(CommentBase):
     class Config:
         from_attributes = True
 
+# 精简视图（view=summary）：只包含列表页需要的列，不嵌套关联对象，由列查询直接构造
+class EventSummary(BaseModel):
+    id: int
+    title: str
+    location: str
+    event_time: datetime
+    capacity: int
+    price: int
+    status: str
+    registered_count: int
+    creator_id: int
+
+    class Config:
+        from_attributes = True
+
+class OrderSummary(BaseModel):
+    id: int
+    event_id: int
+    status: str
+    created_at: datetime
+    event_title: str
+    event_time: datetime
+    event_location: str
+
+    class Config:
+        from_attributes = True
+
+class CommentSummary(CommentBase):
+    id: int
+    user_id: int
+    event_id: int
+    created_at: datetime
+    username: str
+
+    class Config:
+        from_attributes = True
+
 # 搜索和分页 Schemas
 class EventSearchParams(BaseModel):
     search: Optional[str] = None
@@ -110,7 +181,11 @@ class EventSearchParams(BaseModel):
 
 class PaginatedResponse(BaseModel):
     items: List[EventOut]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+class EventSummaryPage(PaginatedResponse):
+    items: List[EventSummary]
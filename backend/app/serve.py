@@ -0,0 +1,183 @@
+"""
+生产环境启动入口
+主进程执行一次数据库迁移并预加载应用，然后 fork 出多个 uvicorn 工作进程共享同一个监听套接字：
+- 工作进程数默认等于可用 CPU 核数，安装了 uvloop / httptools 时自动使用
+- 工作进程异常退出后自动重启
+- 收到 SIGTERM / SIGINT 时先关闭监听套接字，再通知工作进程停止接收新连接、处理完进行中的请求后退出，
+  超过 SERVER_GRACEFUL_TIMEOUT_SECONDS 仍未退出的强制结束
+不支持 fork 的平台（Windows）或只有一个工作进程时在当前进程中直接运行。
+
+用法: python -m app.serve [--host 0.0.0.0] [--port 8000] [--workers N]
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+
+import uvicorn
+
+from . import logging_config, schema
+from .config import settings
+from .database import async_engine, engine
+
+# 以 python -m app.serve 运行时 __name__ 为 "__main__"，显式使用 app 下的 logger
+logger = logging.getLogger("app.serve")
+
+# 工作进程启动后这么短时间内就退出视为启动失败，连续失败时停止重启
+MIN_WORKER_UPTIME_SECONDS = 5
+MAX_FAST_FAILURES = 5
+
+def default_workers() -> int:
+    """可用 CPU 核数（容器中以 CPU 亲和性为准）"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+def _available(module: str) -> bool:
+    try:
+        __import__(module)
+    except ImportError:
+        return False
+    return True
+
+def build_config(host: str, port: int, graceful_timeout: int) -> uvicorn.Config:
+    from .main import app  # 在主进程中预加载，工作进程 fork 后直接复用
+
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        timeout_graceful_shutdown=graceful_timeout,
+    )
+    config.load()
+    return config
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, workers: int, graceful_timeout: int):
+        self.config = config
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.children = {}  # pid -> 启动时间
+        self.stopping = False
+        self.fast_failures = 0
+        self.socket = None
+
+    def _run_worker(self):
+        # 工作进程中由 uvicorn 接管 SIGTERM / SIGINT；它退出时会重新发出收到的信号，这里忽略掉以便正常收尾
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        code = 0
+        try:
+            uvicorn.Server(self.config).run(sockets=[self.socket])
+        except BaseException:
+            logger.exception("工作进程异常退出")
+            code = 1
+        finally:
+            logging_config.stop_logging()
+            os._exit(code)
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.children[pid] = time.monotonic()
+
+    def _handle_stop(self, sig, frame):
+        self.stopping = True
+
+    def _reap(self):
+        """回收已退出的工作进程，未在停止时重新启动"""
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                self.fast_failures += 1
+            else:
+                self.fast_failures = 0
+            if self.fast_failures >= MAX_FAST_FAILURES:
+                logger.error("工作进程连续启动失败，停止服务", extra={"status": status})
+                self.stopping = True
+                return
+            logger.warning("工作进程已退出，重新启动", extra={"pid": pid, "status": status})
+            self.spawn()
+
+    def run(self):
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info("服务已启动", extra={
+            "workers": self.workers, "loop": self.config.loop, "http": self.config.http,
+            "address": f"{self.config.host}:{self.config.port}",
+        })
+
+        while not self.stopping:
+            self._reap()
+            time.sleep(0.2)
+        self.shutdown()
+
+    def shutdown(self):
+        # 先关闭主进程持有的监听套接字，工作进程关闭各自的副本后新连接会被直接拒绝而不是排队
+        self.socket.close()
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in self.children:
+            logger.warning("工作进程未能及时退出，强制结束", extra={"pid": pid})
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+        logger.info("服务已停止")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="多进程启动 API 服务")
+    parser.add_argument("--host", default=settings.server_host)
+    parser.add_argument("--port", type=int, default=settings.server_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers or default_workers(),
+                        help="工作进程数，默认等于可用 CPU 核数")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.server_graceful_timeout_seconds,
+                        help="停止时等待进行中请求完成的秒数")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging_config.setup_logging()
+
+    # 迁移只在主进程中执行一次；fork 前释放连接，避免工作进程共用主进程打开的数据库连接
+    applied = schema.upgrade_schema(engine)
+    if applied:
+        logger.info("已应用数据库迁移", extra={"versions": applied})
+    engine.dispose()
+    if async_engine is not None:
+        async_engine.sync_engine.dispose()
+
+    # 响应缓存等按工作进程数选择实现的模块在导入 app.main 时读取，这里记下实际的进程数
+    settings.server_workers = args.workers
+    config = build_config(args.host, args.port, args.graceful_timeout)
+    if args.workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.Server(config).run()
+        return
+    Supervisor(config, args.workers, args.graceful_timeout).run()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+
+from . import models
+from .config import settings
+
+@dataclass(frozen=True)
+class Principal:
+    """认证后的轻量用户信息，足以满足大多数需要登录的接口"""
+    id: int
+    username: str
+    is_active: bool
+
+class TokenCache:
+    """令牌 → 用户信息的 LRU 缓存，条目在 TTL 或令牌过期（取较早者）后失效"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # token -> (principal, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Principal]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def peek(self, token: str) -> Optional[Principal]:
+        """查看缓存中的用户，不计入命中率也不调整 LRU 顺序（供限流等旁路使用）"""
+        entry = self._entries.get(token)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def set(self, token: str, principal: Principal, token_expires_at: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[token] = (principal, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int):
+        """移除某个用户的所有缓存令牌（用户被停用或信息变更时调用）"""
+        with self._lock:
+            stale = [token for token, (principal, _) in self._entries.items() if principal.id == user_id]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+token_cache = TokenCache(settings.token_cache_size, settings.token_cache_ttl_seconds)
+
+def invalidate_user(user_id: int):
+    token_cache.invalidate_user(user_id)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # 通过 ORM 修改或删除用户时自动失效其缓存令牌
+    token_cache.invalidate_user(target.id)
@@ -0,0 +1,199 @@
+"""
+在线数据库备份脚本
+使用 SQLite 备份 API 按页分步复制正在运行的数据库，每步之间让出锁给写入方；
+备份写入临时文件，经 PRAGMA integrity_check 校验通过后才改为正式文件名，可选 gzip 压缩，
+并按保留策略清理旧备份。适合在服务运行时由 cron 等定时执行。
+
+用法: python backup_db.py [--dir backups] [--compress] [--keep-last 7] [--keep-daily 30]
+"""
+
+import argparse
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+BACKUP_PREFIX = "sports_platform_backup_"
+_BACKUP_NAME = re.compile(rf"^{BACKUP_PREFIX}(\d{{8}})_(\d{{6}})\.db(\.gz)?$")
+
+class BackupError(Exception):
+    pass
+
+class _TooManyRestarts(Exception):
+    pass
+
+class _RestartGuard:
+    """
+    备份过程中源库被其他连接修改时，SQLite 会从头重新复制。
+    剩余页数回升即视为一次重启，超过次数后中止分步复制。
+    """
+
+    def __init__(self, max_restarts: int):
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._remaining = None
+
+    def __call__(self, status, remaining, total):
+        if self._remaining is not None and remaining > self._remaining:
+            self.restarts += 1
+            if self.restarts > self.max_restarts:
+                raise _TooManyRestarts()
+        self._remaining = remaining
+
+def database_path(database_url: str = None) -> str:
+    """DATABASE_URL 对应的 SQLite 文件路径"""
+    url = make_url(database_url or settings.database_url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise BackupError("只支持备份 SQLite 文件数据库")
+    return url.database
+
+def _copy(source_path: str, target_path: str, step_pages: int, step_sleep: float, max_restarts: int) -> int:
+    """复制数据库，返回分步复制时的重启次数"""
+    source = sqlite3.connect(source_path, timeout=settings.sqlite_busy_timeout_ms / 1000)
+    try:
+        guard = _RestartGuard(max_restarts)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=step_pages, progress=guard, sleep=step_sleep)
+        except _TooManyRestarts:
+            # 写入频繁时分步复制可能一直被打断，改为一次复制完：
+            # WAL 模式下这只是一个读事务，不会阻塞写入
+            target.close()
+            os.remove(target_path)
+            target = sqlite3.connect(target_path)
+            source.backup(target)
+        finally:
+            target.close()
+        return guard.restarts
+    finally:
+        source.close()
+
+def _finalize(path: str):
+    """改为回滚日志模式（单个文件即完整备份）并校验完整性"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        result = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    finally:
+        conn.close()
+    if result != ["ok"]:
+        raise BackupError(f"备份校验失败: {'; '.join(result[:5])}")
+
+def _compress(path: str, target_path: str):
+    with open(path, "rb") as src, gzip.open(target_path, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def list_backups(backup_dir: str):
+    """按时间从新到旧列出备份文件 (时间, 路径)"""
+    backups = []
+    if os.path.isdir(backup_dir):
+        for name in os.listdir(backup_dir):
+            match = _BACKUP_NAME.match(name)
+            if match:
+                created = datetime.strptime(match.group(1) + match.group(2), "%Y%m%d%H%M%S")
+                backups.append((created, os.path.join(backup_dir, name)))
+    return sorted(backups, reverse=True)
+
+def rotate_backups(backup_dir: str, keep_last: int, keep_daily: int):
+    """保留最近 keep_last 个备份，以及最近 keep_daily 天中每天最新的一个，删除其余备份，返回被删除的路径"""
+    backups = list_backups(backup_dir)
+    keep = {path for _, path in backups[:keep_last]}
+    days = []
+    for created, path in backups:
+        day = created.date()
+        if day not in days:
+            days.append(day)
+            if len(days) <= keep_daily:
+                keep.add(path)
+
+    removed = []
+    for _, path in backups:
+        if path not in keep:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+def backup_database(
+    source_path: str = None,
+    backup_dir: str = None,
+    compress: bool = None,
+    keep_last: int = None,
+    keep_daily: int = None,
+) -> dict:
+    """备份数据库，返回备份文件路径、大小、耗时等信息；未指定的参数取自配置"""
+    source_path = source_path or database_path()
+    backup_dir = backup_dir or settings.backup_dir
+    compress = settings.backup_compress if compress is None else compress
+    keep_last = settings.backup_keep_last if keep_last is None else keep_last
+    keep_daily = settings.backup_keep_daily if keep_daily is None else keep_daily
+
+    if not os.path.exists(source_path):
+        raise BackupError(f"数据库文件不存在: {source_path}")
+    os.makedirs(backup_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    name = f"{BACKUP_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
+    path = os.path.join(backup_dir, name + (".gz" if compress else ""))
+    # 以点开头的临时文件不会被 list_backups 识别，校验失败也不会参与轮转
+    temp_path = os.path.join(backup_dir, f".{name}.tmp")
+    try:
+        restarts = _copy(
+            source_path, temp_path,
+            settings.backup_step_pages, settings.backup_step_sleep_ms / 1000, settings.backup_max_restarts,
+        )
+        _finalize(temp_path)
+        if compress:
+            _compress(temp_path, temp_path + ".gz")
+            os.replace(temp_path + ".gz", path)
+        else:
+            os.replace(temp_path, path)
+    finally:
+        for leftover in (temp_path, temp_path + ".gz", temp_path + "-journal"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    removed = rotate_backups(backup_dir, keep_last, keep_daily)
+    return {
+        "path": path,
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.perf_counter() - started, 2),
+        "restarts": restarts,
+        "removed": removed,
+    }
+
+def restore_backup(backup_path: str, target_path: str):
+    """把备份（可以是 .gz）还原到 target_path"""
+    opener = gzip.open if backup_path.endswith(".gz") else open
+    with opener(backup_path, "rb") as src, open(target_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="在线备份 SQLite 数据库")
+    parser.add_argument("--dir", default=settings.backup_dir, help="备份目录")
+    parser.add_argument("--compress", action=argparse.BooleanOptionalAction, default=settings.backup_compress)
+    parser.add_argument("--keep-last", type=int, default=settings.backup_keep_last)
+    parser.add_argument("--keep-daily", type=int, default=settings.backup_keep_daily)
+    args = parser.parse_args()
+
+    try:
+        result = backup_database(
+            backup_dir=args.dir, compress=args.compress, keep_last=args.keep_last, keep_daily=args.keep_daily,
+        )
+    except (BackupError, sqlite3.Error) as exc:
+        print(f"备份失败: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"数据库已备份到: {result['path']}（{result['bytes']} 字节，{result['seconds']}s）")
+    for path in result["removed"]:
+        print(f"已删除旧备份: {path}")
+
+if __name__ == "__main__":
+    main()
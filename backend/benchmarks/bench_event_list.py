@@ -0,0 +1,119 @@
+"""
+GET /events?limit=100 吞吐量对比：默认的 Pydantic + json 路径 与 FAST_JSON（orjson + 行元组）路径
+
+用法（在 backend 目录下）:
+    python -m benchmarks.bench_event_list [--events 5000] [--requests 500]
+
+每种模式在独立的子进程中运行（配置在导入 app 时读取），响应缓存关闭，
+使用进程内的 ASGI 客户端，结果只反映查询和序列化的开销。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+MODES = {
+    "default": {"FAST_JSON": "false"},
+    "fast_json": {"FAST_JSON": "true"},
+}
+
+def seed(database_url: str, events: int):
+    os.environ["DATABASE_URL"] = database_url
+    from sqlalchemy import create_engine, insert
+    from app import models, schema
+
+    engine = create_engine(database_url)
+    schema.upgrade_schema(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"bench{i}", "email": f"bench{i}@example.com", "hashed_password": "x", "full_name": f"用户 {i}"}
+            for i in range(1, 51)
+        ])
+        conn.execute(insert(models.Event), [
+            {
+                "title": f"周末篮球赛 {i}",
+                "description": "友谊赛，欢迎各水平球友参加" * 3,
+                "location": "北京市朝阳区体育馆",
+                "event_time": now + timedelta(hours=i),
+                "capacity": 20,
+                "price": 50,
+                "status": "active",
+                "creator_id": i % 50 + 1,
+                "registered_count": i % 20,
+            }
+            for i in range(events)
+        ])
+    engine.dispose()
+
+async def _measure(requests: int, limit: int) -> dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        url = f"/events/?limit={limit}"
+        for _ in range(20):  # 预热
+            response = await client.get(url)
+            response.raise_for_status()
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            await client.get(url)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "req_per_sec": round(requests / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "bytes": len(response.content),
+    }
+
+def worker(requests: int, limit: int):
+    print(json.dumps(asyncio.run(_measure(requests, limit))))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.requests, args.limit)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(database_url, args.events)
+
+        results = {}
+        for mode, env in MODES.items():
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_event_list", "--worker",
+                 "--requests", str(args.requests), "--limit", str(args.limit)],
+                env={**os.environ, **env, "DATABASE_URL": database_url,
+                     "RESPONSE_CACHE_BACKEND": "none", "RATE_LIMIT_BACKEND": "none", "LOG_LEVEL": "WARNING"},
+                capture_output=True, text=True, check=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>10}: {results[mode]['req_per_sec']:>8} req/s  "
+                  f"p50 {results[mode]['p50_ms']} ms  p99 {results[mode]['p99_ms']} ms")
+
+    speedup = results["fast_json"]["req_per_sec"] / results["default"]["req_per_sec"]
+    print(f"{'speedup':>10}: {speedup:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+基准测试数据集
+按规模调用 generate_data 生成用户、活动、订单和评论，用户名为 bench<id>。
+"""
+
+from dataclasses import dataclass
+
+from generate_data import GeneratorConfig, generate
+
+PASSWORD = "bench123"
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    events: int
+    orders: int
+    comments: int
+
+SCALES = {
+    "tiny": Scale(users=200, events=1000, orders=10000, comments=10000),
+    "small": Scale(users=2000, events=10000, orders=100000, comments=100000),
+    "full": Scale(users=20000, events=100000, orders=1000000, comments=1000000),
+}
+
+# 搜索场景使用的关键词
+SEARCH_TERMS = ["篮球", "羽毛球培训", "瑜伽冥想", "足球联谊", "网球", "朝阳区", "游泳训练营"]
+
+def seed(engine, scale: Scale, seed: int = 42):
+    """在空数据库中生成数据集，返回各表的行数"""
+    stats = generate(engine, GeneratorConfig(
+        users=scale.users,
+        events=scale.events,
+        orders=scale.orders,
+        comments=scale.comments,
+        username_prefix="bench",
+        password=PASSWORD,
+        seed=seed,
+    ))
+    return {table: item["rows"] for table, item in stats.items()}
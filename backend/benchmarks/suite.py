@@ -0,0 +1,200 @@
+"""
+接口热点路径的基准测试和压测
+生成（或复用）指定规模的数据集，用进程内的 ASGI 客户端并发请求各个场景，
+统计延迟分位数和吞吐量，结果写入 JSON 文件；指定基线时检查是否出现性能回退。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.suite --scale small --output results.json
+    python -m benchmarks.suite --scale small --baseline baseline.json --threshold 0.2
+
+数据集缓存在 benchmarks/.data/ 中，每次运行使用其副本，报名等写操作不会影响下一次运行。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+
+# 参与回退检查的指标：延迟越高越差，吞吐越低越差
+CHECKED_METRICS = ("p95_ms", "req_per_sec")
+
+def _prepare_database(scale_name: str, reseed: bool, working: str):
+    from sqlalchemy import create_engine
+
+    from benchmarks import dataset
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    cached = os.path.join(DATA_DIR, f"bench-{scale_name}.db")
+    if reseed or not os.path.exists(cached):
+        if os.path.exists(cached):
+            os.remove(cached)
+        print(f"正在生成数据集 {scale_name} ...", file=sys.stderr)
+        started = time.perf_counter()
+        engine = create_engine(f"sqlite:///{cached}")
+        counts = dataset.seed(engine, dataset.SCALES[scale_name])
+        engine.dispose()
+        print(f"数据集生成完成 {counts}，用时 {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    shutil.copyfile(cached, working)
+
+def _percentile(sorted_values, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def _summarize(latencies, statuses, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "req_per_sec": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+def _scenarios(scale, tokens, rng):
+    """场景名 -> 生成单次请求参数 (method, url, kwargs) 的函数"""
+    from benchmarks import dataset
+
+    def auth_headers():
+        return {"Authorization": f"Bearer {rng.choice(tokens)}"}
+
+    return {
+        "list_events": lambda: ("GET", "/events/", {"params": {"page": rng.randint(1, 50), "limit": 20}}),
+        "search_events": lambda: ("GET", "/events/", {"params": {"search": rng.choice(dataset.SEARCH_TERMS), "limit": 20}}),
+        "event_detail": lambda: ("GET", f"/events/{rng.randint(1, scale.events)}", {}),
+        "register": lambda: ("POST", f"/events/{rng.randint(1, scale.events)}/register", {"headers": auth_headers()}),
+        "list_orders": lambda: ("GET", "/orders/", {"headers": auth_headers()}),
+        "login": lambda: ("POST", "/auth/login", {
+            "data": {"username": f"bench{rng.randint(1, scale.users)}", "password": dataset.PASSWORD}
+        }),
+    }
+
+async def _run_scenario(client, make_request, requests: int, concurrency: int):
+    latencies = []
+    statuses = {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            method, url, kwargs = make_request()
+            t0 = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - t0)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summarize(latencies, statuses, time.perf_counter() - started)
+
+async def _run(args, scale) -> dict:
+    import httpx
+
+    from app import auth
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    tokens = [
+        auth.create_access_token({"sub": f"bench{rng.randint(1, scale.users)}"})
+        for _ in range(min(100, scale.users))
+    ]
+    scenarios = _scenarios(scale, tokens, rng)
+    selected = args.scenarios.split(",") if args.scenarios else list(scenarios)
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name in selected:
+            # 登录受 bcrypt 限制，请求数按比例减少
+            requests = max(args.concurrency, args.requests // 10) if name == "login" else args.requests
+            await _run_scenario(client, scenarios[name], min(args.warmup, requests), args.concurrency)
+            results[name] = await _run_scenario(client, scenarios[name], requests, args.concurrency)
+            print(
+                f"{name:>14}: {results[name]['req_per_sec']:>8} req/s  "
+                f"p50 {results[name]['p50_ms']:>7} ms  p95 {results[name]['p95_ms']:>7} ms  "
+                f"p99 {results[name]['p99_ms']:>7} ms  {results[name]['status_codes']}",
+                file=sys.stderr,
+            )
+    return results
+
+def check_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """与基线比较，返回超过阈值的回退描述"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in CHECKED_METRICS:
+            before, after = previous[metric], current[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if metric == "req_per_sec" else change
+            if worse > threshold:
+                regressions.append(f"{name}.{metric}: {before} -> {after} ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=["tiny", "small", "full"], default="small")
+    parser.add_argument("--reseed", action="store_true", help="重新生成缓存的数据集")
+    parser.add_argument("--scenarios", help="逗号分隔的场景名，默认全部")
+    parser.add_argument("--requests", type=int, default=500, help="每个场景的请求数")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="用于对比的历史结果文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的最大回退比例")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 配置在首次导入 app 时读取，必须在导入任何 app 模块之前设置好数据库地址
+        working = os.path.join(workdir, "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{working}"
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        # 所有请求都来自同一个客户端地址，限流会把压测变成测 429
+        os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+
+        from benchmarks import dataset
+
+        _prepare_database(args.scale, args.reseed, working)
+        scenario_results = asyncio.run(_run(args, dataset.SCALES[args.scale]))
+
+    results = {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "scale": args.scale,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "settings": {name: os.environ[name] for name in ("FAST_JSON", "RESPONSE_CACHE_BACKEND", "ASYNC_DB") if name in os.environ},
+        "scenarios": scenario_results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = check_regressions(results, json.load(f), args.threshold)
+        if regressions:
+            print("性能回退超过阈值:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+            sys.exit(1)
+        print(f"未发现超过 {args.threshold:.0%} 的性能回退", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
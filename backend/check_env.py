@@ -108,6 +108,7 @@ def run_health_check():
         print("🎉 环境配置完善，可以启动应用！")
         print("\n建议命令:")
         print("  启动应用: python run.py")
+        print("  生产环境: python -m app.serve")
         print("  API 文档: http://localhost:8000/docs")
     else:
         print("⚠️ 发现问题，请按照上述提示解决")
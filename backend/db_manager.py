@@ -5,23 +5,24 @@
 
 import os
 import sqlite3
-import shutil
-from datetime import datetime
 from app.database import SessionLocal, engine
 from app import models
 import init_db
+import reconcile_counts
+import generate_data
+import backup_db
 
 def backup_database():
-    """备份数据库"""
-    db_file = "sports_platform.db"
-    if os.path.exists(db_file):
-        backup_name = f"sports_platform_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-        shutil.copy2(db_file, backup_name)
-        print(f"数据库已备份到: {backup_name}")
-        return backup_name
-    else:
-        print("数据库文件不存在")
+    """在线备份数据库（服务运行时也可以执行）"""
+    try:
+        result = backup_db.backup_database()
+    except backup_db.BackupError as exc:
+        print(exc)
         return None
+    print(f"数据库已备份到: {result['path']}")
+    for path in result["removed"]:
+        print(f"已删除旧备份: {path}")
+    return result["path"]
 
 def reset_database():
     """重置数据库"""
@@ -69,6 +70,29 @@ def show_database_info():
     
     conn.close()
 
+def generate_bulk_data():
+    """按输入的数量生成大批量测试数据"""
+    defaults = generate_data.GeneratorConfig()
+    counts = {}
+    for name, label in [("users", "用户"), ("events", "活动"), ("orders", "订单"), ("comments", "评论")]:
+        value = input(f"{label}数量 (默认 {getattr(defaults, name)}): ").strip()
+        if value and not value.isdigit():
+            print("请输入正整数")
+            return
+        counts[name] = int(value) if value else getattr(defaults, name)
+
+    print("正在生成数据...")
+    try:
+        stats = generate_data.generate(engine, generate_data.GeneratorConfig(**counts))
+    except generate_data.ExistingDataError:
+        confirm = input("数据库中已有数据。生成期间请先停止 API 服务，确定要追加吗？(y/N): ").strip().lower()
+        if confirm != 'y':
+            return
+        stats = generate_data.generate(engine, generate_data.GeneratorConfig(**counts, allow_existing_data=True))
+    print("数据生成完成！")
+    generate_data.print_stats(stats)
+    print(f"生成的用户: {defaults.username_prefix}<id>，密码: {defaults.password}")
+
 def main():
     """主菜单"""
     while True:
@@ -77,9 +101,11 @@ def main():
         print("2. 初始化数据库")
         print("3. 重置数据库")
         print("4. 备份数据库")
-        print("5. 退出")
+        print("5. 校对报名人数")
+        print("6. 生成大批量测试数据")
+        print("7. 退出")
         
-        choice = input("\n请选择操作 (1-5): ").strip()
+        choice = input("\n请选择操作 (1-7): ").strip()
         
         if choice == '1':
             show_database_info()
@@ -93,6 +119,10 @@ def main():
         elif choice == '4':
             backup_database()
         elif choice == '5':
+            reconcile_counts.reconcile_registered_counts()
+        elif choice == '6':
+            generate_bulk_data()
+        elif choice == '7':
             print("再见！")
             break
         else:
@@ -0,0 +1,372 @@
+"""
+大批量测试数据生成工具
+按可配置的分布生成用户、活动、订单和评论，用 executemany 分批写入，
+多个批次放在同一个事务中提交，所有用户复用同一个预先计算的密码哈希。
+写入期间暂时删除非唯一的二级索引和全文索引触发器，写完后一次性重建；唯一索引始终保留。
+默认只在空数据库上运行，向已有数据的数据库追加需要 --allow-existing-data，并且应先停止 API 服务。
+
+分布：
+- 热门活动：订单和评论按 Zipf 分布集中在少数活动上，热门活动会报满，多出的需求记为已取消订单
+- 用户活跃度：下单和评论的用户同样服从 Zipf 分布
+
+用法: python generate_data.py --users 100000 --events 100000 --orders 1000000 --comments 1000000
+"""
+
+import argparse
+import bisect
+import itertools
+import random
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import fulltext, models, schema
+from app.auth import get_password_hash
+
+# 活动模板（取自 init_db.create_test_data）
+EVENT_TEMPLATES = [
+    ("篮球友谊赛", "欢迎所有篮球爱好者参加！活动包括热身、分组对抗、技术交流等环节。", "奥林匹克公园篮球场"),
+    ("晨跑健身活动", "一起晨跑，健康生活！路线经过公园和湖边，适合所有年龄段的朋友参加。", "圆明园公园"),
+    ("羽毛球培训班", "专业教练指导的羽毛球培训班，包括基础动作、技战术培训、实战练习等。", "体育馆羽毛球厅"),
+    ("足球联谊赛", "公司间足球联谊赛，比赛采用11人制，欢迎各公司组队参加！", "工人体育场"),
+    ("瑜伽冥想课程", "放松身心的瑜伽冥想课程，包括基础瑜伽体式、呼吸练习和冥想。", "瑜伽工作室"),
+    ("网球双打赛", "网球双打积分赛，按水平分组，赛后有技术点评。", "国家网球中心"),
+    ("游泳训练营", "自由泳和蛙泳技术训练，配备救生员和专业教练。", "游泳馆"),
+]
+DISTRICTS = ["北京市朝阳区", "北京市海淀区", "北京市东城区", "北京市西城区", "北京市丰台区", "上海市浦东新区", "杭州市西湖区"]
+COMMENTS = ["期待！", "上次参加过，组织得很好", "新手可以参加吗？", "几点集合？", "已报名，带朋友一起", "场地好找吗", "太棒了"]
+CAPACITIES = [10, 16, 20, 30, 50, 100, 200]
+
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "full_name", "phone", "is_active")
+EVENT_COLUMNS = (
+    "id", "title", "description", "location", "event_time",
+    "capacity", "price", "status", "creator_id", "registered_count",
+)
+ORDER_COLUMNS = ("user_id", "event_id", "status", "created_at", "cancelled_at")
+COMMENT_COLUMNS = ("content", "user_id", "event_id", "created_at")
+
+@dataclass
+class GeneratorConfig:
+    users: int = 10000
+    events: int = 10000
+    orders: int = 100000
+    comments: int = 100000
+    event_skew: float = 1.1   # 活动热度的 Zipf 指数，越大越集中
+    user_skew: float = 1.0    # 用户活跃度的 Zipf 指数
+    cancel_rate: float = 0.05
+    username_prefix: str = "load"
+    password: str = "user123"
+    batch_size: int = 10000
+    transaction_rows: int = 200000
+    seed: int = 42
+    allow_existing_data: bool = False  # 允许向已有数据的数据库追加（需确认没有服务在同时写入）
+
+class ExistingDataError(Exception):
+    """目标数据库中已有数据，且没有明确允许追加"""
+
+class ZipfSampler:
+    """从 [start, start + n) 中按 Zipf(s) 抽样，排名靠前的 id 被抽中的概率最高"""
+
+    def __init__(self, start: int, n: int, s: float, rng: random.Random):
+        self.start = start
+        self.random = rng.random
+        self.cumulative = list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+        self.total = self.cumulative[-1]
+
+    def weights(self):
+        previous = 0.0
+        for value in self.cumulative:
+            yield value - previous
+            previous = value
+
+    def sample(self) -> int:
+        return self.start + bisect.bisect_left(self.cumulative, self.random() * self.total)
+
+    def sample_many(self, k: int) -> list:
+        # 整批抽样，省去逐个调用 sample 的开销
+        start, cumulative, total, random_ = self.start, self.cumulative, self.total, self.random
+        return [start + bisect.bisect_left(cumulative, random_() * total) for _ in range(k)]
+
+def _recreate_indexes(engine, indexes) -> list:
+    """逐个重建索引，每个索引单独一个事务，返回重建失败的索引名"""
+    failed = []
+    for name, sql in indexes:
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(sql)
+        except SQLAlchemyError as exc:
+            print(f"重建索引 {name} 失败: {exc}", file=sys.stderr)
+            failed.append(name)
+    return failed
+
+@contextmanager
+def _deferred_indexes(engine, table_name: str):
+    """
+    SQLite 下先删除表上非唯一的二级索引，写入完成后按原定义重建（排序建索引比逐行维护快得多）。
+    唯一索引不删除，写入期间仍然保证唯一约束。
+    """
+    if engine.dialect.name != "sqlite":
+        yield
+        return
+    with engine.begin() as conn:
+        unique = {row[1] for row in conn.exec_driver_sql(f'PRAGMA index_list("{table_name}")') if row[2]}
+        indexes = [
+            (name, sql) for name, sql in conn.execute(
+                text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+                {"table": table_name}
+            )
+            if name not in unique
+        ]
+        for name, _ in indexes:
+            conn.exec_driver_sql(f'DROP INDEX "{name}"')
+    try:
+        yield
+    except BaseException:
+        # 写入出错时同样重建索引；重建失败只输出，不掩盖原来的异常
+        _recreate_indexes(engine, indexes)
+        raise
+    failed = _recreate_indexes(engine, indexes)
+    if failed:
+        raise RuntimeError(f"以下索引重建失败，请手动重建: {', '.join(failed)}")
+
+class BulkLoader:
+    """
+    分批 executemany 写入，每 transaction_rows 行提交一次。
+    SQLite 下直接把元组交给驱动执行，跳过 SQLAlchemy 逐行的参数处理；其他数据库走 Core insert。
+    """
+
+    def __init__(self, engine, batch_size: int, transaction_rows: int):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.transaction_rows = transaction_rows
+        self.stats = {}
+
+    def _insert(self, conn, table, columns, batch):
+        if conn.dialect.name == "sqlite":
+            placeholders = ", ".join("?" for _ in columns)
+            conn.exec_driver_sql(f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({placeholders})", batch)
+        else:
+            conn.execute(insert(table), [dict(zip(columns, row)) for row in batch])
+
+    def load(self, model, columns, batches) -> int:
+        """batches 为若干批与 columns 顺序一致的元组，耗时包括重建索引"""
+        table = model.__table__
+        started = time.perf_counter()
+        total = 0
+        batches = iter(batches)
+        with _deferred_indexes(self.engine, table.name):
+            while True:
+                with self.engine.begin() as conn:
+                    in_transaction = 0
+                    for batch in batches:
+                        self._insert(conn, table, columns, batch)
+                        in_transaction += len(batch)
+                        if in_transaction >= self.transaction_rows:
+                            break
+                total += in_transaction
+                if in_transaction < self.transaction_rows:
+                    break
+        self.record(table.name, total, time.perf_counter() - started)
+        return total
+
+    def batched(self, rows):
+        """把逐行生成的元组按 batch_size 分批"""
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def record(self, name: str, rows: int, elapsed: float):
+        self.stats[name] = {"rows": rows, "seconds": round(elapsed, 2), "rows_per_sec": round(rows / elapsed) if elapsed else None}
+
+def _next_id(conn, model) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _format(value: datetime) -> str:
+    # 与 SQLAlchemy 的 SQLite DateTime 存储格式一致
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+class RecentTimestamps:
+    """在最近 days 天内均匀抽取时间，直接拼接预先格式化的日期和时分秒，避免逐行调用 strftime"""
+
+    CLOCKS = [f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}" for second in range(86400)]
+
+    def __init__(self, now: datetime, days: int, rng: random.Random):
+        self.random = rng.random
+        start = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.seconds = int((now - start).total_seconds())
+        self.dates = [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(days + 2)]
+
+    def sample_many(self, k: int) -> list:
+        # 格式与 _format 相同
+        random_, dates, clocks = self.random, self.dates, self.CLOCKS
+        return [
+            f"{dates[seconds // 86400]} {clocks[seconds % 86400]}.{int(random_() * 1000000):06d}"
+            for seconds in [int(random_() * self.seconds) for _ in range(k)]
+        ]
+
+@contextmanager
+def _deferred_fulltext_index(engine, first_event: int):
+    """
+    暂停活动表的全文索引触发器，写入完成后一次性为新活动建立索引，
+    比逐行触发快数倍。结束时由 setup_fts 重新创建触发器。
+    """
+    with engine.begin() as conn:
+        enabled = conn.dialect.name == "sqlite" and conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": fulltext.FTS_TABLE}
+        ).first() is not None
+        if enabled:
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fulltext.FTS_TABLE}_ai")
+    try:
+        yield
+    finally:
+        if enabled:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"INSERT INTO {fulltext.FTS_TABLE}(rowid, title, description, location) "
+                    "SELECT id, title, description, location FROM events WHERE id >= :first_event"
+                ), {"first_event": first_event})
+                fulltext.setup_fts(conn)
+
+def generate(engine, config: GeneratorConfig) -> dict:
+    """在现有数据之后追加生成数据，返回各表的写入统计"""
+    rng = random.Random(config.seed)
+    schema.upgrade_schema(engine)
+    with engine.connect() as conn:
+        first_user = _next_id(conn, models.User)
+        first_event = _next_id(conn, models.Event)
+        has_data = any(
+            conn.execute(select(model.id).limit(1)).first() is not None
+            for model in (models.User, models.Event, models.Order, models.Comment)
+        )
+    # 生成期间会删除索引、按预先分配的 id 写入，不能与正在运行的服务同时写同一个数据库
+    if has_data and not config.allow_existing_data:
+        raise ExistingDataError("数据库中已有数据；确认没有服务在使用该数据库后，使用 --allow-existing-data 追加")
+
+    hashed_password = get_password_hash(config.password)
+    now = datetime.utcnow()
+    users = ZipfSampler(first_user, config.users, config.user_skew, rng)
+    event_ids = list(range(first_event, first_event + config.events))
+    # 热度排名随机分配给活动，避免 id 越小越热门
+    hot_ranking = event_ids[:]
+    rng.shuffle(hot_ranking)
+    event_sampler = ZipfSampler(0, config.events, config.event_skew, rng)
+
+    # 每个活动的报名需求按热度分配，超出容量的部分记为已取消订单。
+    # 报名人数在这里预先确定，活动可以先于订单写入，订单以流的方式生成而不必全部放在内存中
+    demand_scale = config.orders / event_sampler.total
+    plans = {}
+    for event_id, weight in zip(hot_ranking, event_sampler.weights()):
+        wanted = int(weight * demand_scale + rng.random())
+        # 热门活动容量更大，但不超过用户数的一半（报名用户互不相同）
+        capacity = min(max(rng.choice(CAPACITIES), min(wanted // 2, 1000)), max(1, config.users // 2))
+        distinct = min(wanted, capacity)
+        active = sum(rng.random() >= config.cancel_rate for _ in range(distinct))
+        plans[event_id] = (capacity, distinct, active, wanted - distinct)
+
+    order_times = RecentTimestamps(now, 30, rng)
+    comment_times = RecentTimestamps(now, 60, rng)
+
+    def user_rows():
+        for user_id in range(first_user, first_user + config.users):
+            yield (
+                user_id, f"{config.username_prefix}{user_id}", f"{config.username_prefix}{user_id}@example.com",
+                hashed_password, f"测试用户{user_id}", f"139{user_id % 10 ** 8:08d}", True,
+            )
+
+    def event_rows():
+        for event_id in event_ids:
+            title, description, place = rng.choice(EVENT_TEMPLATES)
+            capacity, _, registered, _ = plans[event_id]
+            yield (
+                event_id, f"{title} 第{event_id}期", description, f"{rng.choice(DISTRICTS)}{place}",
+                # 约九成是未来的活动
+                _format(now + timedelta(minutes=rng.randint(-14 * 24 * 60, 120 * 24 * 60))),
+                capacity, rng.choice([0, 0, 2000, 5000, 8000]), "active", users.sample(), registered,
+            )
+
+    def order_rows():
+        cancelled_at = _format(now)
+        for event_id in event_ids:
+            _, distinct, active, extra = plans[event_id]
+            user_ids = set(users.sample_many(distinct))
+            while len(user_ids) < distinct:
+                user_ids.add(users.sample())
+            user_ids = list(user_ids)
+            times = order_times.sample_many(distinct + extra)
+            yield from zip(user_ids[:active], itertools.repeat(event_id), itertools.repeat("active"),
+                           times, itertools.repeat(None))
+            yield from zip(user_ids[active:] + users.sample_many(extra), itertools.repeat(event_id),
+                           itertools.repeat("cancelled"), times[active:], itertools.repeat(cancelled_at))
+
+    def comment_batches():
+        for offset in range(0, config.comments, config.batch_size):
+            k = min(config.batch_size, config.comments - offset)
+            yield list(zip(
+                [COMMENTS[int(rng.random() * len(COMMENTS))] for _ in range(k)],
+                users.sample_many(k),
+                [hot_ranking[rank] for rank in event_sampler.sample_many(k)],
+                comment_times.sample_many(k),
+            ))
+
+    loader = BulkLoader(engine, config.batch_size, config.transaction_rows)
+    loader.load(models.User, USER_COLUMNS, loader.batched(user_rows()))
+    started = time.perf_counter()
+    with _deferred_fulltext_index(engine, first_event):
+        count = loader.load(models.Event, EVENT_COLUMNS, loader.batched(event_rows()))
+    loader.record("events", count, time.perf_counter() - started)
+    loader.load(models.Order, ORDER_COLUMNS, loader.batched(order_rows()))
+    loader.load(models.Comment, COMMENT_COLUMNS, comment_batches())
+    return loader.stats
+
+def print_stats(stats: dict):
+    total_rows = sum(item["rows"] for item in stats.values())
+    total_seconds = sum(item["seconds"] for item in stats.values())
+    for table, item in stats.items():
+        print(f"  - {table}: {item['rows']} 行，{item['seconds']}s，{item['rows_per_sec']} 行/秒")
+    if total_seconds:
+        print(f"合计: {total_rows} 行，{total_seconds:.1f}s，{total_rows / total_seconds:.0f} 行/秒")
+
+def parse_args(argv=None) -> GeneratorConfig:
+    defaults = GeneratorConfig()
+    parser = argparse.ArgumentParser(description="生成大批量测试数据")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--events", type=int, default=defaults.events)
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--comments", type=int, default=defaults.comments)
+    parser.add_argument("--event-skew", type=float, default=defaults.event_skew, help="活动热度的 Zipf 指数")
+    parser.add_argument("--user-skew", type=float, default=defaults.user_skew, help="用户活跃度的 Zipf 指数")
+    parser.add_argument("--cancel-rate", type=float, default=defaults.cancel_rate)
+    parser.add_argument("--username-prefix", default=defaults.username_prefix)
+    parser.add_argument("--password", default=defaults.password, help="所有生成用户的密码")
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size)
+    parser.add_argument("--transaction-rows", type=int, default=defaults.transaction_rows)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--allow-existing-data", action="store_true",
+                        help="允许向已有数据的数据库追加，需先停止使用该数据库的服务")
+    return GeneratorConfig(**{name.replace("-", "_"): value for name, value in vars(parser.parse_args(argv)).items()})
+
+def main():
+    from app.database import engine
+
+    config = parse_args()
+    print("正在生成数据...")
+    try:
+        stats = generate(engine, config)
+    except ExistingDataError as exc:
+        print(exc)
+        sys.exit(1)
+    print("数据生成完成！")
+    print_stats(stats)
+    print(f"\n生成的用户: {config.username_prefix}<id>，密码: {config.password}")
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,14 @@
 """
 
 from app.database import SessionLocal, engine
-from app import models
+from app import models, schema
 from app.auth import get_password_hash
 from datetime import datetime, timedelta
 
 def init_db():
     """初始化数据库"""
     print("正在创建数据库表...")
-    models.Base.metadata.create_all(bind=engine)
+    schema.upgrade_schema(engine)
     print("数据库表创建完成！")
 
 def create_test_data():
@@ -0,0 +1,23 @@
+"""
+报名人数校对脚本
+根据订单表重建活动表中的报名人数计数
+"""
+
+from app.database import SessionLocal, engine
+from app import crud, schema
+
+def reconcile_registered_counts():
+    """重建活动报名人数"""
+    schema.upgrade_schema(engine)
+
+    db = SessionLocal()
+    try:
+        print("正在根据订单重建活动报名人数...")
+        fixed = crud.rebuild_registered_counts(db)
+        print(f"校对完成，修正了 {fixed} 个活动的报名人数")
+        return fixed
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    reconcile_registered_counts()
@@ -1,7 +1,15 @@
+import os
+
+# 开发模式只有一个进程，进程内响应缓存可以安全启用（需在导入 app 之前设置）
+os.environ.setdefault("SERVER_WORKERS", "1")
+
 import uvicorn
-from app.main import app
+from app import schema
+from app.database import engine
 
 if __name__ == "__main__":
+    # 开发模式：单进程，代码变动后自动重载；生产环境使用 python -m app.serve
+    schema.upgrade_schema(engine)
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
@@ -48,4 +48,77 @@
 #     # 直接使用 FastAPI 的 TestClient
 #     from fastapi.testclient import TestClient
 #     test_client = TestClient(main.app)
-#     return test_client
\ No newline at end of file
+#     return test_client
+
+import os
+import tempfile
+
+# 在导入 app 前先设置测试环境：应用自身的数据库指向临时文件，导入 app.main 不会改动仓库中的数据库
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'app.db')}"
+# 测试在单个进程内运行，进程内响应缓存照常启用
+os.environ["SERVER_WORKERS"] = "1"
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import schema
+from app.cache import response_cache
+from app.database import configure_engine, get_session
+
+
+@pytest.fixture(scope="function")
+def engine(tmp_path):
+    """基于临时 SQLite 文件的数据库引擎（文件库才能让多个线程真正并发访问）"""
+    test_engine = configure_engine(create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=20,
+        max_overflow=20,
+    ))
+    schema.upgrade_schema(test_engine)
+    yield test_engine
+    test_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(scope="function")
+def db_session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="function")
+def make_client(session_factory):
+    """构造测试客户端：传入路由时挂到新建的应用上，也可以直接传入应用；接口的数据库会话改用测试库"""
+    def override_session():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    apps = []
+
+    def make(*routers, app=None):
+        if app is None:
+            app = FastAPI()
+            for router in routers:
+                app.include_router(router)
+        app.dependency_overrides[get_session] = override_session
+        apps.append(app)
+        return TestClient(app)
+
+    # 响应缓存是进程内全局的，前后清空，避免不同测试库之间串用
+    response_cache.clear()
+    yield make
+    for app in apps:
+        app.dependency_overrides.pop(get_session, None)
+    response_cache.clear()
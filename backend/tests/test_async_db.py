@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 异步引擎在导入时按 ASYNC_DB 创建，因此在独立进程中加载应用
+SCRIPT = textwrap.dedent("""
+    import json
+    from datetime import datetime, timedelta
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app import database, schema
+
+    schema.upgrade_schema(database.engine)
+    from app.main import app
+
+    # database.run 对 AsyncSession 走 run_sync，记录经由它执行的 crud 函数
+    calls = []
+    run_sync = AsyncSession.run_sync
+
+    async def recording_run_sync(self, fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return await run_sync(self, fn, *args, **kwargs)
+
+    AsyncSession.run_sync = recording_run_sync
+
+    with TestClient(app) as client:
+        client.post("/auth/register", json={"username": "alice", "email": "alice@example.com", "password": "secret123"})
+        token = client.post("/auth/login", data={"username": "alice", "password": "secret123"}).json()["access_token"]
+        headers = {"Authorization": "Bearer " + token}
+        event = client.post("/events/", headers=headers, json={
+            "title": "城市马拉松", "location": "杭州", "capacity": 1,
+            "event_time": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+        }).json()
+        order = client.post("/events/%d/register" % event["id"], headers=headers)
+        listing = client.get("/events/").json()
+
+    print(json.dumps({
+        "get_session": database.get_session.__name__,
+        "calls": calls,
+        "order_status": order.status_code,
+        "registered": [item["registered_count"] for item in listing["items"]],
+    }))
+""")
+
+
+def test_async_db_serves_requests_through_async_sessions(tmp_path):
+    env = dict(os.environ, ASYNC_DB="True", DATABASE_URL=f"sqlite:///{tmp_path / 'async.db'}")
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["get_session"] == "get_async_db"
+    assert {"create_user", "create_event", "register_for_event", "get_events"} <= set(report["calls"])
+    assert report["order_status"] == 200
+    assert report["registered"] == [1]
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+
+import backup_db
+
+
+def _count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_compressed_backup_restores_and_passes_integrity_check(engine, tmp_path):
+    source = engine.url.database
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'a', 'a@x', 'x')")
+        conn.exec_driver_sql(
+            "INSERT INTO events (title, location, event_time, capacity, creator_id) "
+            "VALUES ('篮球', '北京', '2030-01-01 10:00:00', 10, 1)"
+        )
+
+    result = backup_db.backup_database(source, str(tmp_path / "backups"), compress=True, keep_last=5, keep_daily=0)
+    assert result["path"].endswith(".db.gz")
+    assert os.listdir(tmp_path / "backups") == [os.path.basename(result["path"])]
+
+    restored = str(tmp_path / "restored.db")
+    backup_db.restore_backup(result["path"], restored)
+    assert _count(restored) == 1
+    conn = sqlite3.connect(restored)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conn.close()
+
+
+def test_rotation_keeps_recent_and_one_per_day(tmp_path):
+    names = [
+        "sports_platform_backup_20240103_120000.db",
+        "sports_platform_backup_20240103_060000.db.gz",
+        "sports_platform_backup_20240102_230000.db",
+        "sports_platform_backup_20240102_010000.db",
+        "sports_platform_backup_20240101_120000.db",
+        "unrelated.db",
+    ]
+    for name in names:
+        (tmp_path / name).write_bytes(b"")
+
+    removed = backup_db.rotate_backups(str(tmp_path), keep_last=1, keep_daily=2)
+
+    assert sorted(os.path.basename(path) for path in removed) == [
+        "sports_platform_backup_20240101_120000.db",
+        "sports_platform_backup_20240102_010000.db",
+        "sports_platform_backup_20240103_060000.db.gz",
+    ]
+    assert (tmp_path / "unrelated.db").exists()
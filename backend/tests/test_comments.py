@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from app import crud, models, schemas
+from app.routers import comments
+
+
+def test_comment_cursor_pages_cover_all_comments(db_session):
+    user = models.User(username="alice", email="alice@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    event = crud.create_event(
+        db_session,
+        schemas.EventCreate(title="跑步", location="杭州", capacity=5, event_time=datetime.utcnow() + timedelta(days=1)),
+        creator_id=user.id,
+    )
+    # created_at 相同的评论由 id 区分先后
+    created = [
+        crud.create_comment(db_session, schemas.CommentCreate(content=f"第 {i} 条", event_id=event.id), user.id).id
+        for i in range(7)
+    ]
+
+    seen, after = [], None
+    while True:
+        page = crud.get_event_comments(db_session, event.id, limit=3, after=after)
+        seen += [comment.id for comment in page]
+        if len(page) < 3:
+            break
+        after = (page[-1].created_at, page[-1].id)
+
+    assert seen == created
+    assert [comment.id for comment in crud.iter_event_comments(db_session, event.id, batch_size=2)] == created
+
+
+def test_comment_endpoint_pages_by_default(db_session, make_client):
+    user = models.User(username="bob", email="bob@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    event = crud.create_event(
+        db_session,
+        schemas.EventCreate(title="骑行", location="成都", capacity=5, event_time=datetime.utcnow() + timedelta(days=1)),
+        creator_id=user.id,
+    )
+    for i in range(comments.DEFAULT_COMMENT_PAGE_SIZE + 5):
+        crud.create_comment(db_session, schemas.CommentCreate(content=f"第 {i} 条", event_id=event.id), user.id)
+
+    client = make_client(comments.router)
+    page = client.get(f"/comments/events/{event.id}")
+    assert len(page.json()) == comments.DEFAULT_COMMENT_PAGE_SIZE
+    rest = client.get(f"/comments/events/{event.id}", params={"cursor": page.headers["x-next-cursor"]})
+    assert len(rest.json()) == 5
+    assert "x-next-cursor" not in rest.headers
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from starlette.requests import Request
+
+from app import conditional
+
+
+def _request(**headers):
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def _event(updated_at=None, registered_count=0):
+    return SimpleNamespace(id=1, created_at=datetime(2024, 1, 1, 8), updated_at=updated_at,
+                           registered_count=registered_count)
+
+
+def test_etag_changes_with_update_and_registrations():
+    base = conditional.make_etag("event", [_event()])
+
+    assert conditional.make_etag("event", [_event()]) == base
+    assert conditional.make_etag("event", [_event(registered_count=1)]) != base
+    assert conditional.make_etag("event", [_event(updated_at=datetime(2024, 1, 2))]) != base
+    assert conditional.make_etag("events", [_event()], 10) != conditional.make_etag("events", [_event()], 11)
+
+
+def test_if_none_match():
+    etag = conditional.make_etag("event", [_event()])
+
+    assert conditional.is_not_modified(_request(if_none_match=etag), etag)
+    assert conditional.is_not_modified(_request(if_none_match=f'"other", {etag.removeprefix("W/")}'), etag)
+    assert not conditional.is_not_modified(_request(if_none_match='W/"other"'), etag)
+
+
+def test_if_modified_since():
+    modified = conditional.last_modified(_event())
+    assert modified.tzinfo is timezone.utc
+
+    assert conditional.is_not_modified(_request(if_modified_since="Mon, 01 Jan 2024 08:00:00 GMT"), "x", modified)
+    assert not conditional.is_not_modified(_request(if_modified_since="Mon, 01 Jan 2024 07:59:59 GMT"), "x", modified)
+    assert not conditional.is_not_modified(_request(if_modified_since="garbage"), "x", modified)
+    # If-None-Match 优先
+    assert not conditional.is_not_modified(
+        _request(if_none_match='W/"other"', if_modified_since="Mon, 01 Jan 2024 08:00:00 GMT"), "x", modified
+    )
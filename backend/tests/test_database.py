@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+
+def test_health_reports_effective_sqlite_pragmas():
+    from app.main import app
+
+    report = TestClient(app).get("/health").json()["database"]
+    assert report["dialect"] == "sqlite"
+    # 每个新连接都应用了调优参数，报告的是连接上实际读到的值
+    assert report["pragmas"] == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 5000,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64000,
+        "temp_store": 2,
+    }
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from app import crud, fulltext, models, schemas
+from app.routers import events
+
+
+def test_event_cursor_pages_cover_all_events(db_session, make_client):
+    user = models.User(username="alice", email="alice@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    start = datetime.utcnow() + timedelta(days=1)
+    # 两个活动时间相同，由 id 区分先后
+    created = [
+        crud.create_event(
+            db_session,
+            schemas.EventCreate(title=f"活动 {i}", location="杭州", capacity=5, event_time=start + timedelta(hours=i // 2)),
+            creator_id=user.id,
+        ).id
+        for i in range(7)
+    ]
+
+    client = make_client(events.router)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, "include_total": False}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/events/", params=params).json()
+        assert body["total"] is None and body["pages"] is None
+        seen += [item["id"] for item in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == created
+
+    first = client.get("/events/", params={"limit": 3}).json()
+    assert (first["total"], first["pages"]) == (7, 3)
+
+    assert client.get("/events/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/events/", params={"cursor": first["next_cursor"], "search": "活动"}).status_code == 400
+
+
+def test_search_uses_trigram_index_and_follows_event_changes(db_session):
+    user = models.User(username="bob", email="bob@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    event_time = datetime.utcnow() + timedelta(days=1)
+    marathon = crud.create_event(
+        db_session,
+        schemas.EventCreate(title="城市马拉松赛", location="杭州", capacity=5, event_time=event_time),
+        creator_id=user.id,
+    )
+    basketball = crud.create_event(
+        db_session,
+        schemas.EventCreate(title="周末篮球赛", location="成都", capacity=5, event_time=event_time),
+        creator_id=user.id,
+    )
+    assert fulltext.is_enabled(db_session)
+
+    def search(term):
+        return [event.id for event in crud.get_events(db_session, search=term)]
+
+    def indexed(term):
+        return [row_id for (row_id,) in db_session.execute(fulltext.matching_ids(fulltext.parse_search(term)[0]))]
+
+    # 三个字及以上走 trigram 索引，可以命中中文子串；两个字的词退回 LIKE
+    assert indexed("马拉松") == search("马拉松") == [marathon.id]
+    assert fulltext.parse_search("篮球") == (None, ["篮球"])
+    assert search("篮球") == [basketball.id]
+    assert search("篮球 周末篮") == [basketball.id]
+
+    crud.update_event(db_session, marathon.id, schemas.EventUpdate(title="城市越野跑"))
+    assert indexed("马拉松") == search("马拉松") == []
+    assert search("越野跑") == [marathon.id]
+
+    crud.delete_event(db_session, marathon.id)
+    assert indexed("越野跑") == search("越野跑") == []
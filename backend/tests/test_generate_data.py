@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import text
+
+import generate_data
+
+
+def _indexes(engine):
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")).scalars())
+
+
+def test_generator_keeps_indexes_and_refuses_populated_databases(engine, monkeypatch):
+    before = _indexes(engine)
+    config = generate_data.GeneratorConfig(users=50, events=20, orders=200, comments=50, batch_size=64, transaction_rows=128)
+    stats = generate_data.generate(engine, config)
+    assert stats["orders"]["rows"] > 0
+    assert _indexes(engine) == before
+
+    # 唯一索引在写入期间不会被删除
+    dropped = []
+    original = generate_data._recreate_indexes
+
+    def recording(engine, indexes):
+        dropped.extend(name for name, _ in indexes)
+        return original(engine, indexes)
+
+    monkeypatch.setattr(generate_data, "_recreate_indexes", recording)
+    with pytest.raises(generate_data.ExistingDataError):
+        generate_data.generate(engine, config)
+    generate_data.generate(engine, generate_data.GeneratorConfig(
+        users=10, events=5, orders=20, comments=5, username_prefix="more", allow_existing_data=True))
+    assert dropped and not {"uq_orders_open_user_event", "ix_users_username", "ix_users_email"} & set(dropped)
+    assert _indexes(engine) == before
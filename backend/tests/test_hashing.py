@@ -0,0 +1,41 @@
+import threading
+
+from passlib.context import CryptContext
+
+from app import hashing, models
+from app.config import settings
+
+
+def test_login_sheds_load_and_upgrades_outdated_hashes(db_session, make_client, monkeypatch):
+    from app.main import app
+
+    # 以较低的成本因子生成的旧哈希
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret123")
+    user = models.User(username="alice", email="alice@example.com", hashed_password=old_hash)
+    db_session.add(user)
+    db_session.commit()
+    client = make_client(app=app)
+    credentials = {"username": "alice", "password": "secret123"}
+
+    try:
+        # 进程池的执行和排队名额都已占满时立即返回 503，不等待
+        full = threading.BoundedSemaphore(1)
+        full.acquire()
+        monkeypatch.setattr(hashing, "_slots", full)
+        busy = client.post("/auth/login", data=credentials)
+        assert busy.status_code == 503
+        assert busy.headers["retry-after"] == "1"
+        monkeypatch.undo()
+
+        assert client.post("/auth/login", data=credentials).status_code == 200
+        db_session.refresh(user)
+        assert user.hashed_password != old_hash
+        assert user.hashed_password.split("$")[2] == f"{settings.bcrypt_rounds:02d}"
+
+        # 升级后的哈希仍然可以登录，且不再重复升级
+        upgraded = user.hashed_password
+        assert client.post("/auth/login", data=credentials).status_code == 200
+        db_session.refresh(user)
+        assert user.hashed_password == upgraded
+    finally:
+        hashing.shutdown()
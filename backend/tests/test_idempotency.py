@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.idempotency import DatabaseStore, IdempotencyMiddleware, MemoryStore
+
+
+class Item(BaseModel):
+    name: str
+
+
+def _app(store):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    app.state.calls = 0
+
+    @app.post("/comments/", status_code=201)
+    def create_item(item: Item):
+        app.state.calls += 1
+        if item.name == "boom":
+            raise HTTPException(status_code=503, detail="unavailable")
+        return {"id": app.state.calls, "name": item.name}
+
+    @app.post("/auth/login")
+    def login(item: Item):
+        app.state.calls += 1
+        return {"access_token": f"token-{app.state.calls}", "token_type": "bearer"}
+
+    return app
+
+
+def test_retry_replays_stored_response(engine, db_session):
+    app = _app(DatabaseStore(engine, max_entries=100))
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "k1", "Authorization": "Bearer a"}
+
+    first = client.post("/comments/", json={"name": "球"}, headers=headers)
+    retry = client.post("/comments/", json={"name": "球"}, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json() == {"id": 1, "name": "球"}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert app.state.calls == 1
+
+    # 同一个键用于不同的请求体
+    assert client.post("/comments/", json={"name": "篮"}, headers=headers).status_code == 422
+    # 不同凭据下相同的键互不影响；不带键的请求照常执行
+    assert client.post("/comments/", json={"name": "球"}, headers={"Idempotency-Key": "k1"}).json()["id"] == 2
+    assert client.post("/comments/", json={"name": "球"}).json()["id"] == 3
+
+    # 5xx 不保存，重试会重新执行
+    assert client.post("/comments/", json={"name": "boom"}, headers={"Idempotency-Key": "k2"}).status_code == 503
+    assert client.post("/comments/", json={"name": "boom"}, headers={"Idempotency-Key": "k2"}).status_code == 503
+    assert app.state.calls == 5
+    assert db_session.query(models.IdempotencyKey).count() == 2
+
+
+class _LostRaceEngine:
+    """每次插入占位行都撞上其他请求的占位，而查询时那一行又已被释放"""
+
+    def __init__(self):
+        self.inserts = 0
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+    def connect(self):
+        return self.begin()
+
+    def execute(self, statement):
+        if statement.is_insert:
+            self.inserts += 1
+            raise IntegrityError(str(statement), {}, Exception("UNIQUE constraint failed"))
+        return self
+
+    def first(self):
+        return None
+
+
+def test_lost_reservation_races_return_409_without_running_handler():
+    engine = _LostRaceEngine()
+    app = _app(DatabaseStore(engine, max_entries=100))
+    response = TestClient(app).post("/comments/", json={"name": "球"}, headers={"Idempotency-Key": "k1"})
+
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+    assert engine.inserts == 3
+    assert app.state.calls == 0
+
+
+def test_stores_are_bounded(engine, db_session):
+    store = DatabaseStore(engine, max_entries=2)
+    for index in range(4):
+        assert store.reserve(f"k{index}", "f", lock_seconds=60) is None
+        store.save(f"k{index}", 201, [], b"{}", ttl=60 + index)
+    store.reserve("expired", "f", lock_seconds=-1)
+    store.prune()
+    assert sorted(key for (key,) in db_session.query(models.IdempotencyKey.key)) == ["k2", "k3"]
+
+    memory = MemoryStore(max_entries=2)
+    for index in range(3):
+        memory.reserve(f"k{index}", "f", lock_seconds=60)
+    assert memory.reserve("k0", "f", lock_seconds=60) is None
+    assert memory.reserve("k2", "f", lock_seconds=60).status_code is None
+
+
+def test_auth_requests_are_never_stored(engine, db_session):
+    app = _app(DatabaseStore(engine, max_entries=100))
+    client = TestClient(app)
+    headers = {"Idempotency-Key": "login-1"}
+
+    first = client.post("/auth/login", json={"name": "secret123"}, headers=headers)
+    retry = client.post("/auth/login", json={"name": "secret123"}, headers=headers)
+    assert first.json()["access_token"] != retry.json()["access_token"]
+    assert "idempotent-replayed" not in retry.headers
+    assert db_session.query(models.IdempotencyKey).count() == 0
@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from app.config import settings
+from app.logging_config import JSONFormatter
+
+
+def _auth_records(caplog, level):
+    """直接在 app.auth 上收集日志：setup_logging 之后 app 的日志不向根 logger 传播，这里也不做采样"""
+    logger = logging.getLogger("app.auth")
+    caplog.set_level(level, logger="app.auth")
+    logger.addHandler(caplog.handler)
+    filters, propagate = logger.filters, logger.propagate
+    logger.filters, logger.propagate = [], False
+    try:
+        token = auth.create_access_token({"sub": "alice"})
+        assert auth.verify_token(token, HTTPException(status_code=401)) == "alice"
+        with pytest.raises(HTTPException):
+            auth.verify_token(token[:-4] + "xxxx", HTTPException(status_code=401))
+    finally:
+        logger.removeHandler(caplog.handler)
+        logger.filters, logger.propagate = filters, propagate
+    return token, [JSONFormatter().format(record) for record in caplog.records if record.name == "app.auth"]
+
+
+def test_auth_path_is_silent_at_info(caplog):
+    _, lines = _auth_records(caplog, logging.INFO)
+    assert lines == []
+
+
+def test_auth_debug_logs_never_include_token_or_key(caplog):
+    token, lines = _auth_records(caplog, logging.DEBUG)
+    assert len(lines) == 3
+    for line in lines:
+        assert token not in line
+        assert token.split(".")[2] not in line
+        assert settings.secret_key not in line
@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import metrics as metrics_module
+from app.config import settings
+from app.metrics import MetricsMiddleware, install_query_hooks, metrics
+
+
+def _app(engine):
+    install_query_hooks(engine)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{count}")
+    def read_items(count: int):
+        # 同步接口在线程池中执行，查询统计经由 contextvar 记到当前请求上
+        with engine.connect() as conn:
+            for item_id in range(count):
+                conn.execute(text("SELECT :id"), {"id": item_id})
+        return {"count": count}
+
+    return app
+
+
+def test_server_timing_and_histograms(engine):
+    metrics.reset()
+    client = TestClient(_app(engine))
+
+    response = client.get("/items/3")
+    assert response.status_code == 200
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+    client.get("/missing")
+
+    body = metrics.render()
+    assert 'http_requests_total{method="GET",route="/items/{count}",status="200"} 1' in body
+    assert f'http_requests_total{{method="GET",route="{metrics_module.UNMATCHED_ROUTE}",status="404"}} 1' in body
+    assert 'http_request_db_queries_bucket{method="GET",route="/items/{count}",le="3"} 1' in body
+    assert 'http_request_db_queries_bucket{method="GET",route="/items/{count}",le="2"} 0' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{count}"} 1' in body
+
+
+def test_repeated_statement_flagged_as_n_plus_one(engine, monkeypatch):
+    monkeypatch.setattr(settings, "n_plus_one_threshold", 5)
+    metrics.reset()
+    client = TestClient(_app(engine))
+
+    client.get("/items/4")
+    assert "http_request_n_plus_one_total{" not in metrics.render()
+
+    client.get("/items/5")
+    assert 'http_request_n_plus_one_total{method="GET",route="/items/{count}"} 1' in metrics.render()
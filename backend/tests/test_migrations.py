@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app import crud, schema
+
+# 基线版本 create_all 建出的表结构（没有 registered_count，也没有任何订单唯一约束）
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (id INTEGER NOT NULL PRIMARY KEY, username VARCHAR(50) NOT NULL, "
+    "email VARCHAR(100) NOT NULL, hashed_password VARCHAR(255) NOT NULL, full_name VARCHAR(100), "
+    "phone VARCHAR(20), is_active BOOLEAN, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME)",
+    "CREATE TABLE events (id INTEGER NOT NULL PRIMARY KEY, title VARCHAR(200) NOT NULL, description TEXT, "
+    "location VARCHAR(200) NOT NULL, event_time DATETIME NOT NULL, capacity INTEGER NOT NULL, price INTEGER, "
+    "status VARCHAR(20), creator_id INTEGER NOT NULL REFERENCES users (id), "
+    "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), updated_at DATETIME)",
+    "CREATE TABLE orders (id INTEGER NOT NULL PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id), "
+    "event_id INTEGER NOT NULL REFERENCES events (id), status VARCHAR(20), "
+    "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), cancelled_at DATETIME)",
+    "CREATE TABLE comments (id INTEGER NOT NULL PRIMARY KEY, content TEXT NOT NULL, "
+    "user_id INTEGER NOT NULL REFERENCES users (id), event_id INTEGER NOT NULL REFERENCES events (id), "
+    "created_at DATETIME DEFAULT (CURRENT_TIMESTAMP))",
+]
+
+
+def test_upgrade_cancels_duplicate_active_orders_from_baseline(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, hashed_password, is_active) VALUES "
+            "(1, 'alice', 'alice@example.com', 'x', 1), (2, 'bob', 'bob@example.com', 'x', 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO events (id, title, location, event_time, capacity, status, creator_id) "
+            "VALUES (1, '篮球赛', '杭州', '2030-01-01 10:00:00', 5, 'active', 1)"
+        ))
+        # 旧的 create_order 并发时为 alice 写入了两条有效订单
+        conn.execute(text(
+            "INSERT INTO orders (id, user_id, event_id, status) VALUES "
+            "(1, 1, 1, 'active'), (2, 1, 1, 'active'), (3, 2, 1, 'active'), (4, 2, 1, 'cancelled')"
+        ))
+
+    try:
+        assert schema.upgrade_schema(engine) == [1, 2, 3, 4, 5, 6, 7, 8]
+        with engine.connect() as conn:
+            statuses = dict(conn.execute(text("SELECT id, status FROM orders")).all())
+            registered = conn.execute(text("SELECT registered_count FROM events WHERE id = 1")).scalar()
+        assert statuses == {1: "active", 2: "cancelled", 3: "active", 4: "cancelled"}
+        assert registered == 2
+        assert "uq_orders_open_user_event" in {index["name"] for index in inspect(engine).get_indexes("orders")}
+        assert schema.upgrade_schema(engine) == []
+    finally:
+        engine.dispose()
+
+
+def test_upgrade_normalizes_comment_timestamps_for_cursor_paging(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as conn:
+        for ddl in BASELINE_SCHEMA:
+            conn.execute(text(ddl))
+        conn.execute(text(
+            "INSERT INTO users (id, username, email, hashed_password, is_active) "
+            "VALUES (1, 'alice', 'alice@example.com', 'x', 1)"
+        ))
+        conn.execute(text(
+            "INSERT INTO events (id, title, location, event_time, capacity, status, creator_id) "
+            "VALUES (1, '篮球赛', '杭州', '2030-01-01 10:00:00', 5, 'active', 1)"
+        ))
+        # 旧版本由 CURRENT_TIMESTAMP 写入，同一秒内的评论没有微秒部分
+        conn.execute(text(
+            "INSERT INTO comments (id, content, user_id, event_id, created_at) VALUES "
+            "(1, 'a', 1, 1, '2024-05-01 08:00:00'), (2, 'b', 1, 1, '2024-05-01 08:00:00'), "
+            "(3, 'c', 1, 1, '2024-05-01 08:00:01')"
+        ))
+
+    try:
+        schema.upgrade_schema(engine)
+        with engine.connect() as conn:
+            stored = conn.execute(text("SELECT created_at FROM comments ORDER BY id")).scalars().all()
+        assert stored == ["2024-05-01 08:00:00.000000", "2024-05-01 08:00:00.000000", "2024-05-01 08:00:01.000000"]
+
+        with Session(engine) as db:
+            first = crud.get_event_comments(db, 1, limit=1)
+            rest = crud.get_event_comments(db, 1, after=(first[0].created_at, first[0].id))
+        assert [comment.id for comment in first + rest] == [1, 2, 3]
+    finally:
+        engine.dispose()
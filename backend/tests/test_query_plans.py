@@ -0,0 +1,116 @@
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app import crud, models, schemas
+
+# "SCAN events" 是全表扫描；虚拟表（全文索引）和临时 B 树排序不算
+_TABLE_SCAN = re.compile(r"^SCAN (?!.*VIRTUAL TABLE)(\w+)")
+
+
+def _seed(db):
+    users = [
+        models.User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+        for i in range(3)
+    ]
+    db.add_all(users)
+    db.commit()
+    for i in range(5):
+        crud.create_event(
+            db,
+            schemas.EventCreate(
+                title=f"篮球友谊赛 {i}",
+                description="周末篮球",
+                location="北京",
+                event_time=datetime.utcnow() + timedelta(days=i + 1),
+                capacity=10,
+            ),
+            creator_id=users[0].id,
+        )
+    return [user.id for user in users]
+
+
+def _run_workload(db, user_ids):
+    """覆盖 crud 中所有请求路径会执行的查询"""
+    creator_id, user_id, other_id = user_ids
+    event_id = crud.get_events(db, limit=1)[0].id
+
+    crud.get_user(db, user_id)
+    crud.get_user_by_username(db, "user1")
+    crud.get_user_by_email(db, "user1@example.com")
+    crud.update_user_password_hash(db, user_id, "y")
+
+    crud.get_event(db, event_id)
+    crud.get_event_detail(db, event_id)
+    events = crud.get_events(db, limit=2)
+    crud.get_events(db, limit=2, after=(events[-1].event_time, events[-1].id))
+    crud.get_events(db, limit=2, skip=2)
+    crud.get_events(db, search="篮球友谊", date_from=datetime.utcnow(), date_to=datetime.utcnow() + timedelta(days=30))
+    crud.get_events(db, search="篮球", location="北京")
+    crud.get_events_count(db)
+    crud.get_events_count(db, search="篮球友谊")
+    crud.get_user_events(db, creator_id)
+    for view in (crud.VIEW_ROWS, crud.VIEW_SUMMARY):
+        crud.get_user_events(db, creator_id, view=view)
+        crud.get_events(db, limit=2, view=view)
+        crud.get_events(db, search="篮球友谊", view=view)
+    crud.update_event(db, event_id, schemas.EventUpdate(title="篮球联赛"))
+
+    _, order = crud.register_for_event(db, user_id, event_id)
+    crud.register_for_event(db, user_id, event_id)
+    crud.get_user_orders(db, user_id)
+    crud.get_user_orders(db, user_id, view=crud.VIEW_ROWS)
+    crud.get_user_orders(db, user_id, view=crud.VIEW_SUMMARY)
+    crud.get_order(db, order.id)
+    crud.get_event_registered_count(db, event_id)
+    # 满员后加入候补队列，取消时队首转正
+    crud.update_event(db, event_id, schemas.EventUpdate(capacity=1))
+    crud.register_for_event(db, other_id, event_id, waitlist=True)
+    crud.get_waitlist_position(db, other_id, event_id)
+    crud.cancel_order(db, order.id, user_id)
+    crud.update_event(db, event_id, schemas.EventUpdate(capacity=10))
+    items = crud.register_batch(db, event_id, user_ids)
+    crud.cancel_orders(db, [order_id for _, _, order_id in items if order_id], user_id)
+
+    comment = crud.create_comment(db, schemas.CommentCreate(content="好", event_id=event_id), other_id)
+    crud.get_event_comments(db, event_id)
+    crud.get_event_comments(db, event_id, limit=10, after=(comment.created_at, comment.id))
+    list(crud.iter_event_comments(db, event_id))
+    crud.get_event_comments(db, event_id, limit=10, view=crud.VIEW_ROWS)
+    crud.get_event_comments(db, event_id, limit=10, view=crud.VIEW_SUMMARY)
+    crud.delete_comment(db, comment.id, other_id)
+
+    crud.delete_event(db, events[-1].id)
+
+
+def test_crud_queries_use_indexes(engine, db_session):
+    user_ids = _seed(db_session)
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    try:
+        _run_workload(db_session, user_ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert statements
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        offenders = []
+        for statement, parameters in statements:
+            for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall():
+                detail = row[-1]
+                if _TABLE_SCAN.match(detail):
+                    offenders.append(f"{detail}\n    {statement}")
+    finally:
+        raw.close()
+
+    assert not offenders, "Table scans found:\n" + "\n".join(offenders)
@@ -0,0 +1,84 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.rate_limit import MemoryStore, RateLimiter, RateLimitMiddleware, client_identity
+from app.token_cache import Principal, token_cache
+
+
+def _app(limiter):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=limiter)
+
+    @app.post("/auth/login")
+    def login():
+        return {}
+
+    @app.get("/events/{event_id}")
+    def read_event(event_id: int):
+        return {"id": event_id}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    return app
+
+
+def test_buckets_per_route_and_client(monkeypatch):
+    limiter = RateLimiter(MemoryStore(shards=4), "3/60", "POST /auth/login=2/60,GET /events/{event_id}=1/60", "/health")
+    client = TestClient(_app(limiter))
+
+    assert [client.post("/auth/login").status_code for _ in range(3)] == [200, 200, 429]
+    limited = client.post("/auth/login")
+    assert 1 <= int(limited.headers["retry-after"]) <= 30
+
+    # 路径参数匹配同一条规则；直连的客户端伪造 X-Real-IP 拿不到新的桶
+    assert client.get("/events/1").status_code == 200
+    assert client.get("/events/2").status_code == 429
+    assert client.get("/events/2", headers={"X-Real-IP": "10.0.0.2"}).status_code == 429
+    monkeypatch.setattr(settings, "rate_limit_trust_x_real_ip", True)
+    assert client.get("/events/2", headers={"X-Real-IP": "10.0.0.3"}).status_code == 429
+
+    # 令牌缓存中的用户按用户计数，与 IP 无关；未校验过的令牌仍按 IP 计数
+    token_cache.set("valid-token", Principal(id=7, username="u", is_active=True))
+    try:
+        assert client.get("/events/3", headers={"Authorization": "Bearer valid-token"}).status_code == 200
+        assert client.get("/events/3", headers={"Authorization": "Bearer valid-token"}).status_code == 429
+        assert client.get("/events/3", headers={"Authorization": "Bearer forged"}).status_code == 429
+    finally:
+        token_cache.clear()
+
+    assert all(client.get("/health").status_code == 200 for _ in range(5))
+
+
+def test_x_real_ip_only_trusted_from_configured_proxies(monkeypatch):
+    def identity(peer, real_ip="203.0.113.9"):
+        return client_identity({"headers": [(b"x-real-ip", real_ip.encode())], "client": (peer, 40000)})
+
+    assert identity("127.0.0.1") == "ip:127.0.0.1"
+
+    monkeypatch.setattr(settings, "rate_limit_trust_x_real_ip", True)
+    monkeypatch.setattr(settings, "rate_limit_trusted_proxies", "127.0.0.1,172.18.0.0/16")
+    assert identity("127.0.0.1") == "ip:203.0.113.9"
+    assert identity("172.18.0.5") == "ip:203.0.113.9"
+    assert identity("198.51.100.7") == "ip:198.51.100.7"
+    assert identity("testclient") == "ip:testclient"
+
+
+def test_memory_store_refills_and_stays_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.rate_limit.time.monotonic", lambda: now[0])
+    store = MemoryStore(shards=1, max_entries=3)
+
+    assert store.acquire("a", 2, 1.0) == 0
+    assert store.acquire("a", 2, 1.0) == 0
+    assert store.acquire("a", 2, 1.0) == 1.0
+    now[0] += 0.5
+    assert store.acquire("a", 2, 1.0) == 0.5
+    now[0] += 0.5
+    assert store.acquire("a", 2, 1.0) == 0
+
+    for key in "bcdef":
+        store.acquire(key, 2, 1.0)
+    assert store.stats()["buckets"] <= 3
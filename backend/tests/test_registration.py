@@ -0,0 +1,228 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, models
+
+
+def _create_users(db, count):
+    users = [
+        models.User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x")
+        for i in range(count)
+    ]
+    db.add_all(users)
+    db.commit()
+    return [user.id for user in users]
+
+
+def _create_event(db, creator_id, capacity):
+    event = models.Event(
+        title="热门活动",
+        location="北京",
+        event_time=datetime.utcnow() + timedelta(days=1),
+        capacity=capacity,
+        creator_id=creator_id,
+    )
+    db.add(event)
+    db.commit()
+    return event.id
+
+
+def test_register_outcomes(db_session):
+    """报名结果：成功、重复、满员"""
+    user_ids = _create_users(db_session, 3)
+    event_id = _create_event(db_session, user_ids[0], capacity=1)
+
+    outcome, order = crud.register_for_event(db_session, user_id=user_ids[1], event_id=event_id)
+    assert outcome == crud.REGISTRATION_CREATED
+    assert order.status == "active"
+
+    outcome, order = crud.register_for_event(db_session, user_id=user_ids[1], event_id=event_id)
+    assert outcome == crud.REGISTRATION_DUPLICATE
+    assert order is None
+
+    outcome, order = crud.register_for_event(db_session, user_id=user_ids[2], event_id=event_id)
+    assert outcome == crud.REGISTRATION_FULL
+
+    outcome, order = crud.register_for_event(db_session, user_id=user_ids[2], event_id=event_id + 1)
+    assert outcome == crud.REGISTRATION_NOT_FOUND
+
+
+def test_cancel_releases_seat_once(db_session):
+    """取消订单只释放一次名额"""
+    user_ids = _create_users(db_session, 3)
+    event_id = _create_event(db_session, user_ids[0], capacity=1)
+
+    _, order = crud.register_for_event(db_session, user_id=user_ids[1], event_id=event_id)
+    crud.cancel_order(db_session, order_id=order.id, user_id=user_ids[1])
+    crud.cancel_order(db_session, order_id=order.id, user_id=user_ids[1])
+    assert crud.get_event_registered_count(db_session, event_id) == 0
+
+    outcome, _ = crud.register_for_event(db_session, user_id=user_ids[2], event_id=event_id)
+    assert outcome == crud.REGISTRATION_CREATED
+    outcome, _ = crud.register_for_event(db_session, user_id=user_ids[1], event_id=event_id)
+    assert outcome == crud.REGISTRATION_FULL
+
+
+def test_concurrent_registration_never_oversells(db_session, session_factory):
+    """多线程同时抢报同一个活动：不超卖、不重复下单"""
+    capacity = 25
+    user_ids = _create_users(db_session, 60)
+    event_id = _create_event(db_session, user_ids[0], capacity=capacity)
+
+    # 每个用户提交两次，模拟重复点击
+    attempts = [user_id for user_id in user_ids for _ in range(2)]
+    outcomes = []
+    outcomes_lock = threading.Lock()
+    start = threading.Barrier(30)
+
+    def worker(chunk):
+        session = session_factory()
+        try:
+            start.wait()
+            for user_id in chunk:
+                outcome, _ = crud.register_for_event(session, user_id=user_id, event_id=event_id)
+                with outcomes_lock:
+                    outcomes.append(outcome)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(attempts[i::30],)) for i in range(30)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(outcomes) == len(attempts)
+    assert outcomes.count(crud.REGISTRATION_CREATED) == capacity
+
+    db_session.expire_all()
+    active_orders = db_session.query(models.Order).filter(
+        models.Order.event_id == event_id, models.Order.status == "active"
+    ).all()
+    assert len(active_orders) == capacity
+    assert len({order.user_id for order in active_orders}) == capacity
+    assert crud.get_event_registered_count(db_session, event_id) == capacity
+
+
+def test_batch_registration_and_cancellation(db_session):
+    """批量报名按请求顺序占满名额，批量取消按活动释放名额"""
+    user_ids = _create_users(db_session, 6)
+    event_id = _create_event(db_session, user_ids[0], capacity=3)
+    crud.register_for_event(db_session, user_id=user_ids[1], event_id=event_id)
+
+    batch = [user_ids[1], user_ids[2], user_ids[2], 9999, user_ids[3], user_ids[4]]
+    assert [outcome for _, outcome, _ in crud.register_batch(db_session, event_id, batch, all_or_nothing=True)] == [
+        crud.REGISTRATION_DUPLICATE, crud.REGISTRATION_SKIPPED, crud.REGISTRATION_DUPLICATE,
+        crud.REGISTRATION_USER_NOT_FOUND, crud.REGISTRATION_SKIPPED, crud.REGISTRATION_FULL,
+    ]
+    assert crud.get_event_registered_count(db_session, event_id) == 1
+
+    items = crud.register_batch(db_session, event_id, batch)
+    assert [outcome for _, outcome, _ in items] == [
+        crud.REGISTRATION_DUPLICATE, crud.REGISTRATION_CREATED, crud.REGISTRATION_DUPLICATE,
+        crud.REGISTRATION_USER_NOT_FOUND, crud.REGISTRATION_CREATED, crud.REGISTRATION_FULL,
+    ]
+    assert crud.get_event_registered_count(db_session, event_id) == 3
+
+    order_id = items[1][2]
+    other_order_id = items[4][2]
+    assert crud.cancel_orders(db_session, [order_id, order_id, other_order_id, 9999], user_id=user_ids[2]) == [
+        (order_id, crud.CANCELLATION_CANCELLED),
+        (order_id, crud.CANCELLATION_DUPLICATE),
+        (other_order_id, crud.CANCELLATION_FORBIDDEN),
+        (9999, crud.CANCELLATION_NOT_FOUND),
+    ]
+    assert crud.cancel_orders(db_session, [order_id], user_id=user_ids[2]) == [
+        (order_id, crud.CANCELLATION_ALREADY_CANCELLED),
+    ]
+    assert crud.get_event_registered_count(db_session, event_id) == 2
+
+
+def test_all_or_nothing_batch_ignores_repeated_ids(db_session):
+    """请求中重复的用户 id 不影响 all_or_nothing 判断"""
+    user_ids = _create_users(db_session, 3)
+    event_id = _create_event(db_session, user_ids[0], capacity=2)
+
+    items = crud.register_batch(db_session, event_id, [user_ids[1], user_ids[2], user_ids[1]], all_or_nothing=True)
+    assert [outcome for _, outcome, _ in items] == [
+        crud.REGISTRATION_CREATED, crud.REGISTRATION_CREATED, crud.REGISTRATION_DUPLICATE,
+    ]
+    assert crud.get_event_registered_count(db_session, event_id) == 2
+
+
+def test_waitlist_promotes_in_order_on_cancellation(db_session):
+    """活动满员后加入候补队列，取消订单时队首自动转正"""
+    user_ids = _create_users(db_session, 5)
+    event_id = _create_event(db_session, user_ids[0], capacity=1)
+
+    _, order = crud.register_for_event(db_session, user_id=user_ids[1], event_id=event_id, waitlist=True)
+    outcome, first = crud.register_for_event(db_session, user_id=user_ids[2], event_id=event_id, waitlist=True)
+    assert outcome == crud.REGISTRATION_WAITLISTED
+    assert first.status == crud.ORDER_STATUS_WAITLISTED
+    _, second = crud.register_for_event(db_session, user_id=user_ids[3], event_id=event_id, waitlist=True)
+    outcome, _ = crud.register_for_event(db_session, user_id=user_ids[2], event_id=event_id, waitlist=True)
+    assert outcome == crud.REGISTRATION_DUPLICATE
+
+    _, position, waiting = crud.get_waitlist_position(db_session, user_ids[3], event_id)
+    assert (position, waiting) == (2, 2)
+
+    crud.cancel_order(db_session, order_id=order.id, user_id=user_ids[1])
+    db_session.expire_all()
+    assert crud.get_order(db_session, first.id).status == crud.ORDER_STATUS_ACTIVE
+    assert crud.get_event_registered_count(db_session, event_id) == 1
+    _, position, waiting = crud.get_waitlist_position(db_session, user_ids[3], event_id)
+    assert (position, waiting) == (1, 1)
+
+    # 候补订单取消后只是退出队列，不影响名额
+    crud.cancel_order(db_session, order_id=second.id, user_id=user_ids[3])
+    assert crud.get_waitlist_position(db_session, user_ids[3], event_id) is None
+    assert crud.get_event_registered_count(db_session, event_id) == 1
+
+
+def test_concurrent_register_and_waitlist_keep_one_open_order(db_session, session_factory):
+    """同一用户同时报名和候补只会留下一个订单，之后取消其他人的订单仍能正常转正"""
+    user_ids = _create_users(db_session, 3)
+    creator_id, holder_id, user_id = user_ids
+
+    for _ in range(10):
+        event_id = _create_event(db_session, creator_id, capacity=2)
+        _, held = crud.register_for_event(db_session, user_id=holder_id, event_id=event_id)
+        barrier = threading.Barrier(2)
+        outcomes = []
+
+        def register(waitlist):
+            db = session_factory()
+            try:
+                barrier.wait()
+                outcomes.append(crud.register_for_event(db, user_id=user_id, event_id=event_id, waitlist=waitlist)[0])
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=register, args=(waitlist,)) for waitlist in (False, True)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 先到的请求占到最后一个名额；另一个请求要么因重复被拒，要么（普通报名）因满员被拒
+        assert outcomes.count(crud.REGISTRATION_CREATED) == 1
+        assert crud.REGISTRATION_WAITLISTED not in outcomes
+        open_orders = db_session.query(models.Order).filter(
+            models.Order.event_id == event_id,
+            models.Order.user_id == user_id,
+            models.Order.status.in_(["active", "waitlisted"]),
+        ).count()
+        assert open_orders == 1
+
+        assert crud.cancel_order(db_session, order_id=held.id, user_id=holder_id) is not None
+        assert crud.get_event_registered_count(db_session, event_id) == 1
+
+    # 即使绕过报名流程直接插入，唯一索引也不允许同时存在有效和候补订单
+    db_session.add(models.Order(user_id=user_id, event_id=event_id, status="waitlisted"))
+    try:
+        db_session.commit()
+        assert False, "expected IntegrityError"
+    except IntegrityError:
+        db_session.rollback()
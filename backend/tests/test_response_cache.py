@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import cache, crud, models, schemas
+from app.cache import FakeRedis, MemoryBackend, RedisBackend, ResponseCache, response_cache
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2, max_bytes=1024)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+    assert backend.stats()["entries"] == 2
+
+
+def test_memory_backend_respects_byte_budget():
+    backend = MemoryBackend(max_entries=100, max_bytes=50)
+    for i in range(10):
+        backend.set(f"k{i}", b"x" * 10)
+
+    assert backend.bytes <= 50
+    assert backend.get("k9") == b"x" * 10
+
+
+@pytest.mark.parametrize("backend", [MemoryBackend(100, 10 ** 6), RedisBackend(FakeRedis())])
+def test_list_generation_changes_key(backend):
+    cache = ResponseCache(backend, ttl=30)
+    key = cache.event_list_key({"page": 1, "limit": 10, "search": None})
+    cache.set(key, b"[]")
+
+    assert cache.get(key) == b"[]"
+    cache.invalidate_event_list()
+    assert cache.get(cache.event_list_key({"limit": 10, "page": 1})) is None
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_generations_survive_lru_eviction():
+    backend = MemoryBackend(max_entries=2, max_bytes=1024)
+    cache_ = ResponseCache(backend, ttl=30)
+    stale_key = cache_.event_list_key({"page": 1})
+    cache_.set(stale_key, b"stale")
+    cache_.invalidate_event_list()
+
+    # 旧页面仍然常被读取，排在 LRU 末尾的只有新写入的条目
+    for i in range(3):
+        backend.get(stale_key)
+        cache_.set(f"other{i}", b"x")
+    assert backend.get(stale_key) == b"stale"
+    assert cache_.event_list_key({"page": 1}) != stale_key
+
+
+def test_memory_cache_only_defaults_on_for_a_single_worker(monkeypatch):
+    monkeypatch.setattr(cache.settings, "response_cache_backend", "auto")
+    monkeypatch.setattr(cache.settings, "server_workers", 1)
+    assert isinstance(cache._create_backend(), MemoryBackend)
+    monkeypatch.setattr(cache.settings, "server_workers", 4)
+    assert cache._create_backend() is None
+    monkeypatch.setattr(cache.settings, "response_cache_backend", "fake")
+    assert isinstance(cache._create_backend(), RedisBackend)
+
+
+def test_writes_invalidate_cached_responses(db_session):
+    user = models.User(username="alice", email="alice@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    event = crud.create_event(
+        db_session,
+        schemas.EventCreate(
+            title="羽毛球", location="上海", capacity=5,
+            event_time=datetime.utcnow() + timedelta(days=1),
+        ),
+        creator_id=user.id,
+    )
+
+    list_key = response_cache.event_list_key({"page": 1})
+    detail_key = response_cache.event_detail_key(event.id)
+    comments_key = response_cache.event_comments_key(event.id)
+    for key in (list_key, detail_key, comments_key):
+        response_cache.set(key, b"cached")
+
+    comment = crud.create_comment(db_session, schemas.CommentCreate(content="好", event_id=event.id), user.id)
+    assert response_cache.event_comments_key(event.id) != comments_key
+    assert response_cache.get(detail_key) == b"cached"
+
+    _, order = crud.register_for_event(db_session, user.id, event.id)
+    assert response_cache.get(detail_key) is None
+    assert response_cache.event_list_key({"page": 1}) != list_key
+
+    response_cache.set(detail_key, b"cached")
+    crud.cancel_order(db_session, order.id, user.id)
+    assert response_cache.get(detail_key) is None
+
+    comments_key = response_cache.event_comments_key(event.id)
+    crud.delete_comment(db_session, comment.id, user.id)
+    assert response_cache.event_comments_key(event.id) != comments_key
@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+from app import crud, models, responses, schemas
+
+pytest.importorskip("orjson")
+
+
+def test_row_payload_matches_pydantic_serialization(db_session):
+    user = models.User(username="alice", email="alice@example.com", hashed_password="x", full_name="爱丽丝")
+    db_session.add(user)
+    db_session.commit()
+    event = crud.create_event(
+        db_session,
+        schemas.EventCreate(title="篮球", location="北京", capacity=5, event_time=datetime.utcnow() + timedelta(days=1)),
+        creator_id=user.id,
+    )
+    crud.register_for_event(db_session, user.id, event.id)
+    crud.create_comment(db_session, schemas.CommentCreate(content="好", event_id=event.id), user.id)
+
+    cases = [
+        (crud.get_events(db_session), crud.get_events(db_session, view=crud.VIEW_ROWS), schemas.EventOut),
+        (crud.get_user_orders(db_session, user.id), crud.get_user_orders(db_session, user.id, view=crud.VIEW_ROWS),
+         schemas.OrderOut),
+        (crud.get_event_comments(db_session, event.id),
+         crud.get_event_comments(db_session, event.id, view=crud.VIEW_ROWS), schemas.CommentOut),
+    ]
+    for objects, rows, schema in cases:
+        adapter = TypeAdapter(List[schema])
+        expected = adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+        # 快速路径的输出与 Pydantic 路径逐字节一致
+        assert responses.dumps(responses.rows_payload(rows, schema)) == expected
@@ -0,0 +1,51 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(url, proc):
+    for _ in range(100):
+        assert proc.poll() is None, proc.stdout.read().decode()
+        try:
+            return httpx.get(url)
+        except httpx.TransportError:
+            time.sleep(0.1)
+    pytest.fail("server did not start")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="多进程模式需要 fork")
+def test_serve_migrates_once_and_stops_gracefully(tmp_path):
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'serve.db'}")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    )
+    try:
+        assert _wait_until_up(f"http://127.0.0.1:{port}/health", proc).status_code == 200
+        assert httpx.get(f"http://127.0.0.1:{port}/events/").status_code == 200
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    output = proc.stdout.read().decode()
+    assert output.count("已应用数据库迁移") == 1
+    assert output.count("Finished server process") == 2
+    assert "服务已停止" in output
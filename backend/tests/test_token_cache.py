@@ -0,0 +1,63 @@
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+
+from app import auth, dependencies, models
+from app.routers import auth as auth_router
+from app.token_cache import token_cache
+
+
+def test_token_cache_skips_lookups_until_user_changes(db_session, make_client):
+    user = models.User(username="alice", email="alice@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    token = auth.create_access_token({"sub": "alice"})
+
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(current_user=Depends(dependencies.get_current_active_user)):
+        return {"id": current_user.id}
+
+    client = make_client(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    token_cache.clear()
+    hits, misses = token_cache.hits, token_cache.misses
+    try:
+        for _ in range(3):
+            assert client.get("/me", headers=headers).json() == {"id": user.id}
+        assert (token_cache.hits - hits, token_cache.misses - misses) == (2, 1)
+
+        token_cache.invalidate_user(user.id)
+        assert client.get("/me", headers=headers).status_code == 200
+        assert (token_cache.hits - hits, token_cache.misses - misses) == (2, 2)
+
+        # 通过 ORM 停用用户后缓存立即失效，下一次请求重新查库并拒绝
+        user.is_active = False
+        db_session.commit()
+        assert client.get("/me", headers=headers).status_code == 400
+        assert (token_cache.hits - hits, token_cache.misses - misses) == (2, 3)
+    finally:
+        token_cache.clear()
+
+
+def test_me_rejects_cached_token_of_user_deleted_outside_orm(db_session, make_client):
+    user = models.User(username="carol", email="carol@example.com", hashed_password="x")
+    db_session.add(user)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': 'carol'})}"}
+
+    client = make_client(auth_router.router)
+    token_cache.clear()
+    try:
+        assert client.get("/auth/me", headers=headers).json()["username"] == "carol"
+
+        # 直接执行 SQL 删除用户，不触发 ORM 事件，缓存仍保留该令牌
+        db_session.execute(text("DELETE FROM users WHERE id = :id"), {"id": user.id})
+        db_session.commit()
+        db_session.expunge_all()
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 401
+        assert response.headers["www-authenticate"] == "Bearer"
+        assert client.get("/auth/me", headers=headers).status_code == 401
+    finally:
+        token_cache.clear()
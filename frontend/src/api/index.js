@@ -108,8 +108,8 @@ export const commentsAPI = {
     // 创建评论
     createComment: (commentData) => api.post('/comments/', commentData),
 
-    // 获取活动评论
-    getEventComments: (eventId) => api.get(`/comments/events/${eventId}`),
+    // 获取活动评论（分页，下一页的游标在响应头 X-Next-Cursor 中）
+    getEventComments: (eventId, params = {}) => api.get(`/comments/events/${eventId}`, { params }),
 
     // 删除评论
     deleteComment: (commentId) => api.delete(`/comments/${commentId}`),
@@ -39,6 +39,8 @@ const EventDetail = () => {
 
     const [event, setEvent] = useState(null);
     const [comments, setComments] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loading, setLoading] = useState(true);
     const [submitting, setSubmitting] = useState(false);
     const [registering, setRegistering] = useState(false);
@@ -55,16 +57,24 @@ const EventDetail = () => {
         }
     };
 
-    // 加载评论
-    const loadComments = async () => {
+    // 加载评论：不传游标时重新加载第一页，否则追加下一页
+    const loadComments = async (cursor = null) => {
         try {
-            const response = await commentsAPI.getEventComments(id);
-            setComments(response.data);
+            const response = await commentsAPI.getEventComments(id, cursor ? { cursor } : {});
+            setComments(cursor ? (prev) => [...prev, ...response.data] : response.data);
+            setNextCursor(response.headers['x-next-cursor'] || null);
         } catch (error) {
             console.error('Load comments error:', error);
         }
     };
 
+    // 加载更多评论
+    const handleLoadMoreComments = async () => {
+        setLoadingMore(true);
+        await loadComments(nextCursor);
+        setLoadingMore(false);
+    };
+
     // 初始加载
     useEffect(() => {
         const loadData = async () => {
@@ -359,6 +369,15 @@ const EventDetail = () => {
                                     />
                                 </List.Item>
                             )}
+                            loadMore={
+                                nextCursor ? (
+                                    <div style={{ textAlign: 'center', marginTop: 16 }}>
+                                        <Button onClick={handleLoadMoreComments} loading={loadingMore}>
+                                            加载更多评论
+                                        </Button>
+                                    </div>
+                                ) : null
+                            }
                         />
                     ) : (
                         <div style={{